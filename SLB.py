@@ -3,6 +3,9 @@ import pandas as pd
 import joblib
 import matplotlib.pyplot as plt
 
+from esquema import leer_csv
+from rasgos_modelo import RasgosModelo
+
 # --- Configuración de la página con branding SLB ---
 st.set_page_config(
     page_title="Optimización de Combustible SLB",
@@ -28,7 +31,7 @@ st.markdown("""
 # --- Carga del histórico para poblar selectboxes ---
 @st.cache_data
 def load_df_modelo():
-    return pd.read_csv("df_modelo.csv")
+    return leer_csv("df_modelo.csv")
 
 df_modelo = load_df_modelo()
 
@@ -45,6 +48,16 @@ model_rend = load_model_rendimiento()
 if model_rend is None:
     st.stop()
 
+# --- Rasgos por conductor y vehículo guardados al entrenar (o armados una vez de df_modelo) ---
+@st.cache_resource
+def load_rasgos_modelo():
+    try:
+        return RasgosModelo.cargar()
+    except FileNotFoundError:
+        return RasgosModelo.construir(df_modelo)
+
+rasgos_modelo = load_rasgos_modelo()
+
 # --- Sidebar y navegación ---
 with st.sidebar:
     st.markdown("""
@@ -109,18 +122,12 @@ elif page == "Predicción Rendimiento":
     estacion  = st.selectbox("Estación Pemex", estaciones)
 
     if st.button("Calcular rendimiento"):
-        # 1) Calcula features numéricos desde todo el histórico
-        cs  = df_modelo[df_modelo["conductor"].astype(str)==conductor]["conductor_score"].mean()
-        vs  = df_modelo[df_modelo["vehículo"].astype(str)==vehiculo]["vehiculo_score"].mean()
-        rcm = df_modelo[df_modelo["conductor"].astype(str)==conductor]["rend_cond_mean"].mean()
-        rvm = df_modelo[df_modelo["vehículo"].astype(str)==vehiculo]["rend_veh_mean"].mean()
+        # 1) Features numéricos del conductor y del vehículo (búsqueda en las tablas de rasgos)
+        rasgos = rasgos_modelo.rasgos(conductor, vehiculo, omision=None)
 
         # 2) Construye el DataFrame de entrada
         X_input = pd.DataFrame([{
-            "conductor_score":   cs,
-            "vehiculo_score":    vs,
-            "rend_cond_mean":    rcm,
-            "rend_veh_mean":     rvm,
+            **rasgos,
             "division":          division,
             "bl":                bl,
             "mercancía":         mercancia,
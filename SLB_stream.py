@@ -8,6 +8,11 @@ from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
 
+from esquema import aplicar_esquema, leer_csv
+from grafo_json import leer_detalle, leer_grafo
+from indice_nodos import IndiceNodos, cargar_estadisticas
+from rasgos_modelo import RasgosModelo
+
 # --- Configuración de la página ---
 st.set_page_config(
     page_title="SLB • Energy Analytics Platform",
@@ -544,10 +549,10 @@ st.markdown("""
 @st.cache_data
 def load_df_modelo():
     try:
-        return pd.read_csv("df_modelo.csv")
+        return leer_csv("df_modelo.csv")
     except:
         # Datos de ejemplo si no existe el archivo
-        return pd.DataFrame({
+        return aplicar_esquema(pd.DataFrame({
             'conductor': ['Juan Pérez', 'Ana García', 'Carlos López'] * 10,
             'Unidad': ['VEH001', 'VEH002', 'VEH003'] * 10,
             'vehículo': ['VEH001', 'VEH002', 'VEH003'] * 10,
@@ -559,7 +564,7 @@ def load_df_modelo():
             'vehiculo_score': np.random.rand(30),
             'rend_cond_mean': np.random.rand(30),
             'rend_veh_mean': np.random.rand(30)
-        })
+        }))
 
 @st.cache_resource
 def load_model_rendimiento():
@@ -568,20 +573,110 @@ def load_model_rendimiento():
     except:
         return None
 
+# Rasgos por conductor y por vehículo guardados al entrenar (rasgos_modelo/); si no
+# están, se arman una sola vez a partir de df_modelo
+@st.cache_resource
+def load_rasgos_modelo():
+    try:
+        return RasgosModelo.cargar()
+    except FileNotFoundError:
+        return RasgosModelo.construir(load_df_modelo())
+
 def load_df_malos_contexto():
     try:
-        return pd.read_csv("df_malos_contexto.csv")
+        return leer_csv("df_malos_contexto.csv")
     except:
         # Datos de ejemplo
-        return pd.DataFrame({
+        return aplicar_esquema(pd.DataFrame({
             'conductor': ['Juan Pérez', 'Ana García', 'Carlos López'] * 5,
             'Unidad': ['VEH001', 'VEH002', 'VEH003'] * 5,
             'no_estación_pemex': ['EST001', 'EST002', 'EST003'] * 5
-        })
+        }))
+
+# Índice CSR nodo -> filas del grafo Mapper (arreglos con mmap, no se deserializa completo)
+@st.cache_resource
+def load_indice_nodos():
+    try:
+        return IndiceNodos.cargar("df_mapper_index")
+    except FileNotFoundError:
+        return None
+
+# Grafo Mapper compacto (mapper_grafo.json, unos KB) en lugar del HTML de KeplerMapper
+@st.cache_data
+def load_grafo_mapper():
+    try:
+        return leer_grafo("mapper_grafo.json")
+    except FileNotFoundError:
+        return None
+
+# Estadísticas por nodo precalculadas junto al índice (average, std, sum, max, min por columna)
+@st.cache_data
+def load_estadisticas_nodos():
+    try:
+        return cargar_estadisticas("df_mapper_index")
+    except FileNotFoundError:
+        return None
+
+# Filas de un nodo, leídas solo cuando se selecciona (del Parquet de detalle si existe)
+@st.cache_data
+def load_detalle_nodo(nombre):
+    indice_nodos = load_indice_nodos()
+    if indice_nodos is None or nombre not in indice_nodos:
+        return pd.DataFrame()
+    filas = np.asarray(indice_nodos.filas(nombre))
+    try:
+        return leer_detalle(filas, "mapper_detalle.parquet")
+    except FileNotFoundError:
+        return pd.DataFrame({"fila": filas})
+
+def figura_grafo_mapper(grafo, color=None, titulo=None):
+    nodos = grafo["nodos"]
+    x, y = nodos["x"], nodos["y"]
+    aristas_x, aristas_y = [], []
+    for a, b in grafo["aristas"]:
+        aristas_x += [x[a], x[b], None]
+        aristas_y += [y[a], y[b], None]
+
+    # Color elegido, o por fracción de cargas de bajo rendimiento; si no se conoce, por rendimiento real
+    if color is not None:
+        escala = "RdYlGn"
+    elif any(valor is not None for valor in nodos["frac_bajo"]):
+        color, escala, titulo = nodos["frac_bajo"], "RdYlGn_r", "Bajo rend."
+    else:
+        color, escala, titulo = nodos["media"]["rendimiento_real"], "RdYlGn", "Rend. real"
+    tamaños = np.asarray(nodos["tamaño"], dtype=float)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=aristas_x, y=aristas_y, mode="lines",
+        line=dict(color="#CBD5E1", width=1), hoverinfo="skip"
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=y, mode="markers",
+        customdata=np.stack([nodos["nombre"], nodos["tamaño"]], axis=-1),
+        marker=dict(
+            size=8 + 22 * np.sqrt(tamaños / max(tamaños.max(), 1)),
+            color=color, colorscale=escala, colorbar=dict(title=titulo),
+            line=dict(color="white", width=1)
+        ),
+        hovertemplate="%{customdata[0]}<br>Filas: %{customdata[1]}<extra></extra>"
+    ))
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Inter"),
+        showlegend=False,
+        height=650,
+        margin=dict(l=10, r=10, t=10, b=10),
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False)
+    )
+    return fig
 
 # --- Carga de datos ---
 df_modelo = load_df_modelo()
 model_rend = load_model_rendimiento()
+rasgos_modelo = load_rasgos_modelo()
 
 # --- Sidebar Navigation ---
 with st.sidebar:
@@ -1020,25 +1115,63 @@ elif current_page == "mapping":
     # Información sobre el mapa
     col1, col2 = st.columns([2, 1])
     
+    grafo_mapper = load_grafo_mapper()
+
     with col1:
-        try:
-            with open("mapper_output_bueno.html", "r", encoding="utf-8") as f:
-                html_mapper = f.read()
-            
+        if grafo_mapper is not None:
             st.markdown("""
             <div style="background: var(--bg-primary); border: 1px solid var(--border); border-radius: 16px; padding: 1rem; margin: 1rem 0;">
                 <h4 style="color: var(--primary); margin-bottom: 1rem;">🔍 Mapa Interactivo TDA</h4>
             </div>
             """, unsafe_allow_html=True)
             
-            st.components.v1.html(html_mapper, height=700, scrolling=True)
+            # Cualquier estadística precalculada sirve como color, sin recorrer filas
+            nombres_nodos = grafo_mapper["nodos"]["nombre"]
+            estadisticas_nodos = load_estadisticas_nodos()
+            color_nodos, titulo_color = None, None
+            if estadisticas_nodos is not None:
+                opciones_color = [col for col in estadisticas_nodos.columns if col != "tamaño"]
+                titulo_color = st.selectbox(
+                    "🎨 Color de los nodos",
+                    opciones_color,
+                    index=opciones_color.index("rendimiento_real_average") if "rendimiento_real_average" in opciones_color else 0
+                )
+                color_nodos = estadisticas_nodos[titulo_color].reindex(nombres_nodos).tolist()
             
-        except FileNotFoundError:
+            evento = st.plotly_chart(
+                figura_grafo_mapper(grafo_mapper, color_nodos, titulo_color),
+                use_container_width=True,
+                on_select="rerun",
+                selection_mode="points",
+                key="grafo_mapper"
+            )
+            
+            # Detalle del nodo seleccionado en el grafo (o en la lista)
+            puntos = [p for p in evento.selection.points if p["curve_number"] == 1]
+            nodo = st.selectbox(
+                "🔎 Nodo",
+                nombres_nodos,
+                index=puntos[0]["point_index"] if puntos else 0
+            )
+            i = nombres_nodos.index(nodo)
+            frac_bajo = grafo_mapper["nodos"]["frac_bajo"][i]
+            
+            col_a, col_b, col_c = st.columns(3)
+            col_a.metric("Filas", grafo_mapper["nodos"]["tamaño"][i])
+            col_b.metric("Bajo rendimiento", f"{frac_bajo:.0%}" if frac_bajo is not None else "—")
+            col_c.metric("Rend. real medio", grafo_mapper["nodos"]["media"]["rendimiento_real"][i])
+            if estadisticas_nodos is not None and nodo in estadisticas_nodos.index:
+                fila_nodo = estadisticas_nodos.loc[nodo].drop("tamaño")
+                fila_nodo.index = pd.MultiIndex.from_tuples([col.rsplit("_", 1) for col in fila_nodo.index])
+                st.dataframe(fila_nodo.unstack(), use_container_width=True)
+            st.dataframe(load_detalle_nodo(nodo), use_container_width=True, height=300)
+            
+        else:
             st.markdown("""
             <div style="background: var(--bg-primary); border: 1px solid var(--border); border-radius: 16px; padding: 3rem; text-align: center; margin: 1rem 0;">
                 <div style="font-size: 4rem; margin-bottom: 1rem; opacity: 0.5;">🗺️</div>
                 <h3 style="color: var(--text-secondary); margin-bottom: 1rem;">Mapa Topológico No Disponible</h3>
-                <p style="color: var(--text-muted);">El archivo mapper_output_bueno.html no se encuentra en el directorio.</p>
+                <p style="color: var(--text-muted);">El archivo mapper_grafo.json no se encuentra en el directorio.</p>
                 <p style="font-size: 0.9rem; color: var(--text-muted);">
                     Este espacio mostraría el análisis topológico interactivo con nodos de bajo rendimiento resaltados.
                 </p>
@@ -1076,26 +1209,32 @@ elif current_page == "mapping":
         """, unsafe_allow_html=True)
         
         # Estadísticas del mapa
-        st.markdown("""
+        indice_nodos = load_indice_nodos()
+        resumen = grafo_mapper["resumen"] if grafo_mapper is not None else {}
+        nodos_totales = resumen.get("n_nodos", len(indice_nodos) if indice_nodos is not None else "—")
+        conexiones = resumen.get("n_aristas", "—")
+        componentes = resumen.get("n_componentes", "—")
+        nodos_bajos = f"{resumen['nodos_bajos']} nodos" if "nodos_bajos" in resumen else "—"
+        st.markdown(f"""
         <div style="background: var(--bg-primary); border: 1px solid var(--border); border-radius: 16px; padding: 1.5rem; margin: 1rem 0;">
             <h4 style="color: var(--primary); margin-bottom: 1.5rem;">📊 Estadísticas TDA</h4>
             
             <div style="margin-bottom: 1rem;">
                 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
                     <span style="font-size: 0.9rem; color: var(--text-secondary);">Nodos Totales</span>
-                    <span style="font-weight: 600; color: var(--text-primary);">47</span>
+                    <span style="font-weight: 600; color: var(--text-primary);">{nodos_totales}</span>
                 </div>
                 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
                     <span style="font-size: 0.9rem; color: var(--text-secondary);">Conexiones</span>
-                    <span style="font-weight: 600; color: var(--text-primary);">128</span>
+                    <span style="font-weight: 600; color: var(--text-primary);">{conexiones}</span>
                 </div>
                 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
                     <span style="font-size: 0.9rem; color: var(--text-secondary);">Componentes</span>
-                    <span style="font-weight: 600; color: var(--text-primary);">3</span>
+                    <span style="font-weight: 600; color: var(--text-primary);">{componentes}</span>
                 </div>
                 <div style="display: flex; justify-content: space-between; align-items: center;">
                     <span style="font-size: 0.9rem; color: var(--text-secondary);">Bajo Rendimiento</span>
-                    <span style="font-weight: 600; color: var(--error);">12 nodos</span>
+                    <span style="font-weight: 600; color: var(--error);">{nodos_bajos}</span>
                 </div>
             </div>
         </div>
@@ -1197,18 +1336,12 @@ elif current_page == "prediction":
     if predict_button:
         with st.spinner("Calculando predicción..."):
             try:
-                # Cálculo de features
-                cs = df_modelo[df_modelo["conductor"].astype(str)==conductor]["conductor_score"].mean()
-                vs = df_modelo[df_modelo["vehículo"].astype(str)==vehiculo]["vehiculo_score"].mean()
-                rcm = df_modelo[df_modelo["conductor"].astype(str)==conductor]["rend_cond_mean"].mean()
-                rvm = df_modelo[df_modelo["vehículo"].astype(str)==vehiculo]["rend_veh_mean"].mean()
+                # Features del conductor y del vehículo (0.5 y 10.0 si no tienen historial)
+                rasgos = rasgos_modelo.rasgos(conductor, vehiculo)
 
                 # Preparar datos para predicción
                 X_input = pd.DataFrame([{
-                    "conductor_score": cs if not pd.isna(cs) else 0.5,
-                    "vehiculo_score": vs if not pd.isna(vs) else 0.5,
-                    "rend_cond_mean": rcm if not pd.isna(rcm) else 10.0,
-                    "rend_veh_mean": rvm if not pd.isna(rvm) else 10.0,
+                    **rasgos,
                     "division": division,
                     "bl": bl,
                     "mercancía": mercancia,
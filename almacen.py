@@ -0,0 +1,240 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cuantiles import SketchCuantiles
+from esquema import aplicar_esquema
+from ingesta import AÑOS, escribir_parquet, iterar_libro, ruta_libro
+from limpieza import COLUMNAS_MES, derivar_mes, derivar_unidad, filtrar_un_paso, limpiar_edenred
+
+# --- Almacén incremental de df_filtrado ---
+# Cada lote nuevo se guarda como una parte Parquet con las filas que pasan los filtros
+# fijos (rendimiento_real en (0, 25) y recorrido > 0). Lo que depende de toda la
+# historia (columnas con <= 30% de nulos y cuantiles 1%/99% de recorrido) se guarda
+# como estadísticas acumuladas (conteo de nulos y un sketch de cuantiles de recorrido)
+# y se aplica al leer. Las huellas de las filas ya vistas se guardan ordenadas en un
+# archivo por lote (huellas/lote-00000.npy), que no se vuelve a escribir: cada lote
+# nuevo se busca en ellos con mmap y solo escribe las suyas.
+DIR_ALMACEN = "almacen_filtrado"
+ESTADO = "estado.json"
+DIR_HUELLAS = "huellas"
+DIR_SKETCH = "sketch"
+
+# Subir este número cuando cambie la huella de las filas o el formato del estado: a un
+# almacén de otra versión no se le pueden agregar lotes, hay que reconstruirlo
+VERSION_ALMACEN = 4
+
+UMBRAL_NULOS = 0.3
+CUANTIL_INF = 0.01
+CUANTIL_SUP = 0.99
+# Error relativo máximo de las cotas de recorrido (0.1%)
+ALFA_SKETCH = 0.001
+
+
+def estado_vacio():
+    return {
+        "version": VERSION_ALMACEN, "n_filas": 0, "nulos": {}, "partes": [], "huellas": [],
+        "sketch": None, "q_inf": None, "q_sup": None,
+    }
+
+
+def leer_estado(dir_almacen=DIR_ALMACEN):
+    ruta = os.path.join(dir_almacen, ESTADO)
+    if not os.path.exists(ruta):
+        return estado_vacio()
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_estado(estado, dir_almacen=DIR_ALMACEN):
+    ruta = os.path.join(dir_almacen, ESTADO)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def guardar_arreglo(arreglo, dir_almacen, nombre):
+    ruta = os.path.join(dir_almacen, nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta + ".tmp", "wb") as f:
+        np.save(f, arreglo)
+    os.replace(ruta + ".tmp", ruta)
+
+
+# Texto de una celda para la huella: los números enteros se escriben sin decimales y
+# los demás con repr de float, así que 123, 123.0 (columna float por un NaN en el
+# bloque), Int64 y object dan el mismo texto. El resto de los valores, con str
+def texto_canonico(valor):
+    if isinstance(valor, (int, float, np.integer, np.floating)) and not isinstance(valor, (bool, np.bool_)):
+        valor = float(valor)
+        if valor.is_integer():
+            return str(int(valor))
+        return repr(valor)
+    return str(valor)
+
+
+# Huella de cada fila limpia: suma (módulo 2**64) de la huella de cada celda no nula
+# junto con el nombre de su columna. Una celda nula y una columna que no está cuentan
+# igual (nada), así que la huella no depende de qué columnas completamente vacías quitó
+# limpiar_edenred en cada bloque o en cada export. Se calcula sobre el texto canónico
+# de cada valor distinto para que no dependa de cómo se infirieron los tipos (Excel,
+# bloques o Parquet)
+def hash_filas(df):
+    huellas = np.zeros(len(df), dtype=np.uint64)
+    # Las columnas de mes salen de month y año: no cambian la huella de la fila
+    for col in df.columns.difference(COLUMNAS_MES):
+        codigos, unicos = pd.factorize(df[col].to_numpy(dtype=object))
+        texto = np.array([f"{col}\x1f{texto_canonico(valor)}" for valor in unicos], dtype=object)
+        por_valor = np.append(pd.util.hash_array(texto), np.uint64(0))
+        huellas += np.where(df[col].isna().to_numpy(), np.uint64(0), por_valor[codigos])
+    return huellas
+
+
+# True para las huellas que ya están en alguno de los archivos de lote (ordenados),
+# abiertos con mmap: la memoria no crece con la historia
+def huellas_vistas(huellas, archivos, dir_almacen=DIR_ALMACEN):
+    vistas = np.zeros(len(huellas), dtype=bool)
+    for archivo in archivos:
+        ordenadas = np.load(os.path.join(dir_almacen, archivo), mmap_mode="r")
+        if len(ordenadas):
+            posiciones = np.searchsorted(ordenadas, huellas).clip(max=len(ordenadas) - 1)
+            vistas |= ordenadas[posiciones] == huellas
+    return vistas
+
+
+# Filtros de filas que no dependen del resto de la historia
+def filtrar_candidatas(df):
+    df = filtrar_un_paso(df).copy()
+    df["Unidad"] = derivar_unidad(df)
+    df["rendimiento_real"] = pd.to_numeric(df["rendimiento_real"], errors="coerce")
+    df["recorrido"] = pd.to_numeric(df["recorrido"], errors="coerce")
+    return df
+
+
+# Agrega un lote ya limpio (salida de limpiar_edenred). Solo procesa las filas que no
+# estaban en la historia; regresa cuántas filas nuevas entraron
+def agregar(df_limpio, dir_almacen=DIR_ALMACEN):
+    os.makedirs(dir_almacen, exist_ok=True)
+    estado = leer_estado(dir_almacen)
+    if estado.get("version", 1) != VERSION_ALMACEN:
+        raise ValueError(
+            f"El almacén '{dir_almacen}' es de la versión {estado.get('version', 1)} (actual: "
+            f"{VERSION_ALMACEN}); reconstrúyelo con agregar_años en un directorio vacío."
+        )
+
+    # Deduplicar contra la historia y dentro del mismo lote
+    huellas = hash_filas(df_limpio)
+    ya_vistas = huellas_vistas(huellas, estado["huellas"], dir_almacen)
+    nuevas = ~ya_vistas & ~pd.Series(huellas).duplicated().to_numpy()
+    df_nuevo = df_limpio[nuevas]
+    if df_nuevo.empty:
+        return 0
+
+    # Índice global: la posición que la fila tendría en df_edenred
+    df_nuevo = df_nuevo.set_axis(pd.RangeIndex(estado["n_filas"], estado["n_filas"] + len(df_nuevo)))
+
+    # Las columnas de mes no se guardan: leer_filtrado las deriva de month y año
+    df_nuevo = df_nuevo.drop(columns=COLUMNAS_MES, errors="ignore")
+
+    # Nulos por columna sobre todas las filas limpias, como en el filtro de columnas original
+    for col, n in df_nuevo.isnull().sum().items():
+        estado["nulos"][col] = estado["nulos"].get(col, estado["n_filas"]) + int(n)
+    for col in set(estado["nulos"]) - set(df_nuevo.columns):
+        estado["nulos"][col] += len(df_nuevo)
+    estado["n_filas"] += len(df_nuevo)
+
+    candidatas = filtrar_candidatas(df_nuevo)
+    if not candidatas.empty:
+        parte = f"parte-{len(estado['partes']):05d}.parquet"
+        # El índice se guarda como columna para que sobreviva a los filtros de lectura
+        escribir_parquet(candidatas, os.path.join(dir_almacen, parte), preserve_index=True)
+        estado["partes"].append(parte)
+
+    anterior = estado["sketch"]
+    sketch = SketchCuantiles(ALFA_SKETCH)
+    if anterior is not None:
+        sketch = SketchCuantiles.cargar(os.path.join(dir_almacen, anterior), ALFA_SKETCH)
+    sketch.actualizar(candidatas["recorrido"])
+    estado["q_inf"] = sketch.cuantil(CUANTIL_INF)
+    estado["q_sup"] = sketch.cuantil(CUANTIL_SUP)
+
+    # La parte, las huellas y el sketch se escriben con el número del lote y solo el
+    # estado los apunta: guardar el estado confirma el lote completo. Un archivo que no
+    # quedó en el estado (p. ej. si el proceso se interrumpe antes de guardarlo) no se
+    # consulta y se reescribe con el siguiente lote
+    numero = len(estado["huellas"])
+    lote = os.path.join(DIR_HUELLAS, f"lote-{numero:05d}.npy")
+    guardar_arreglo(np.sort(huellas[nuevas]), dir_almacen, lote)
+    estado["huellas"].append(lote)
+
+    estado["sketch"] = os.path.join(DIR_SKETCH, f"recorrido-{numero:05d}.json")
+    os.makedirs(os.path.join(dir_almacen, DIR_SKETCH), exist_ok=True)
+    sketch.guardar(os.path.join(dir_almacen, estado["sketch"]))
+
+    guardar_estado(estado, dir_almacen)
+    # El sketch anterior ya no lo apunta nadie
+    if anterior is not None:
+        os.remove(os.path.join(dir_almacen, anterior))
+    return len(df_nuevo)
+
+
+# Carga un export (un año completo o un mes nuevo) bloque por bloque: normalización,
+# fechas, conceptos y filtros numéricos se aplican a cada bloque y solo el bloque
+# vive en memoria. Regresa cuántas filas nuevas entraron
+def agregar_libro(ruta, año, dir_almacen=DIR_ALMACEN, filas_por_bloque=50_000):
+    nuevas = 0
+    for bloque in iterar_libro(ruta, filas_por_bloque):
+        nuevas += agregar(limpiar_edenred(bloque, año), dir_almacen)
+    return nuevas
+
+
+# Construye (o completa) el almacén con todos los años, uno detrás de otro
+def agregar_años(años=AÑOS, dir_almacen=DIR_ALMACEN, filas_por_bloque=50_000):
+    return {año: agregar_libro(ruta_libro(año), año, dir_almacen, filas_por_bloque) for año in años}
+
+
+# Columnas con <= 30% de nulos sobre toda la historia, más la clave Unidad (las de mes
+# no cuentan: se derivan al leer)
+def columnas_validas(estado):
+    n = max(estado["n_filas"], 1)
+    validas = [
+        col for col, nulos in estado["nulos"].items()
+        if nulos / n <= UMBRAL_NULOS and col not in COLUMNAS_MES
+    ]
+    return validas + ["Unidad"]
+
+
+# df_filtrado con los cuantiles vigentes, leyendo solo las columnas y filas necesarias,
+# ya con el esquema compacto. mes_clave y fecha_mes se derivan aquí de month y año, así
+# que también salen completas para las partes escritas antes de que existieran
+def leer_filtrado(dir_almacen=DIR_ALMACEN):
+    estado = leer_estado(dir_almacen)
+    validas = columnas_validas(estado)
+    filtros = [("recorrido", ">=", estado["q_inf"]), ("recorrido", "<=", estado["q_sup"])]
+    partes = []
+    for parte in estado["partes"]:
+        ruta = os.path.join(dir_almacen, parte)
+        presentes = set(pq.read_schema(ruta).names)
+        columnas = [col for col in validas if col in presentes]
+        tabla = pq.read_table(
+            ruta, columns=columnas, filters=filtros, memory_map=True, use_pandas_metadata=True
+        )
+        partes.append(tabla.to_pandas())
+    if not partes:
+        return pd.DataFrame(columns=validas + COLUMNAS_MES)
+    df = aplicar_esquema(pd.concat(partes).reindex(columns=validas).sort_index())
+    if "month" in df.columns and "año" in df.columns:
+        df[COLUMNAS_MES] = derivar_mes(df)
+    return df
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python almacen.py "Edenred 2025-01.xlsx" 2025
+    if len(sys.argv) != 3:
+        sys.exit("Uso: python almacen.py <libro.xlsx> <año>")
+    print(f"Filas nuevas: {agregar_libro(sys.argv[1], int(sys.argv[2]))}")
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from homologia import FEATURES_H0, MIN_FILAS, topologia_por_grupo
+from limpieza import clave_a_texto
+
+# --- Almacén de rasgos topológicos por vehículo y mes ---
+# Métricas H0 (las de df_topologia) de cada (identificador_vehículo, mes), guardadas en
+# Parquet particionado por mes: almacen_topologia/mes=2022-04/parte.parquet. Cada
+# partición se escribe completa y de una vez, así que agregar un mes no toca los demás
+# y la historia de un vehículo es una lectura filtrada por identificador.
+DIR_TOPOLOGIA = "almacen_topologia"
+COLUMNA_VEHICULO = "identificador_vehículo"
+COLUMNA_MES = "mes_clave"
+
+
+def _ruta_mes(mes, dir_almacen):
+    return os.path.join(dir_almacen, f"mes={mes}")
+
+
+def meses_guardados(dir_almacen=DIR_TOPOLOGIA):
+    if not os.path.isdir(dir_almacen):
+        return []
+    return sorted(
+        nombre[len("mes="):] for nombre in os.listdir(dir_almacen)
+        if nombre.startswith("mes=") and os.path.exists(os.path.join(dir_almacen, nombre, "parte.parquet"))
+    )
+
+
+def _escribir_mes(tabla, mes, dir_almacen):
+    destino = _ruta_mes(mes, dir_almacen)
+    # Con punto al inicio pyarrow ignora la carpeta temporal al leer el almacén
+    temporal = os.path.join(dir_almacen, f".mes={mes}.tmp")
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    pq.write_table(pa.Table.from_pandas(tabla, preserve_index=False), os.path.join(temporal, "parte.parquet"), compression="zstd")
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+
+
+# Calcula los meses de `df` que aún no están en el almacén (y los de `rehacer`, "AAAA-MM",
+# p. ej. el mes en curso, que sigue recibiendo cargas). Los meses se toman de la clave
+# entera mes_clave de la ingesta. Todos los (vehículo, mes) pendientes van en una sola
+# pasada de topologia_por_grupo, repartida en el pool de procesos. Regresa los meses escritos
+def actualizar_topologia(df, dir_almacen=DIR_TOPOLOGIA, rehacer=(), features=FEATURES_H0,
+                         min_filas=MIN_FILAS, n_procesos=None):
+    claves = df[COLUMNA_MES].dropna().unique().astype(np.int64)
+    texto = dict(zip(claves.tolist(), clave_a_texto(claves).tolist()))
+    guardados = set(meses_guardados(dir_almacen))
+    rehacer = {str(mes) for mes in rehacer}
+    pendientes = [clave for clave, mes in texto.items() if mes not in guardados or mes in rehacer]
+    if not pendientes:
+        return []
+
+    en_pendientes = df[COLUMNA_MES].isin(pendientes).fillna(False).to_numpy(dtype=bool)
+    nuevos = df.loc[en_pendientes, [COLUMNA_VEHICULO, COLUMNA_MES, "rendimiento_real"] + list(features)]
+    tabla = topologia_por_grupo(nuevos, [COLUMNA_VEHICULO, COLUMNA_MES], features, min_filas, n_procesos)
+
+    # Un mes sin ningún vehículo con min_filas filas no se escribe (no hay nada que guardar)
+    os.makedirs(dir_almacen, exist_ok=True)
+    escritos = []
+    for clave, del_mes in tabla.groupby(COLUMNA_MES, sort=True):
+        del_mes = del_mes.drop(columns=COLUMNA_MES).sort_values(COLUMNA_VEHICULO)
+        _escribir_mes(del_mes.reset_index(drop=True), texto[int(clave)], dir_almacen)
+        escritos.append(texto[int(clave)])
+    return escritos
+
+
+# Rasgos guardados, opcionalmente solo de algunos vehículos o meses; columna "Mes" como
+# texto "AAAA-MM", ordenados por vehículo y mes
+def leer_topologia(vehiculos=None, meses=None, dir_almacen=DIR_TOPOLOGIA):
+    dataset = ds.dataset(dir_almacen, format="parquet", partitioning="hive", exclude_invalid_files=True)
+    filtro = None
+    if vehiculos is not None:
+        filtro = ds.field(COLUMNA_VEHICULO).isin(list(vehiculos))
+    if meses is not None:
+        por_mes = ds.field("mes").isin([str(mes) for mes in meses])
+        filtro = por_mes if filtro is None else filtro & por_mes
+    tabla = dataset.to_table(filter=filtro).to_pandas()
+    tabla["mes"] = tabla["mes"].astype(str)
+    tabla = tabla.rename(columns={"mes": "Mes"}).sort_values([COLUMNA_VEHICULO, "Mes"])
+    return tabla.reset_index(drop=True)
+
+
+# Historia mensual de un vehículo (el df_mensual del notebook)
+def historial_vehiculo(identificador, dir_almacen=DIR_TOPOLOGIA):
+    tabla = leer_topologia([identificador], dir_almacen=dir_almacen)
+    return tabla[["Mes"] + [col for col in tabla.columns if col not in ("Mes", COLUMNA_VEHICULO)]]
@@ -0,0 +1,165 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN
+
+from mapper_paralelo import (
+    _iniciar_proceso, calcular_nervio, celdas_cobertura, cubos_cobertura, dbscan_en_grafo,
+    grafo_vecinos, nodos_de_etiquetas,
+)
+
+# --- Barrido de parámetros del Mapper (n_cubes, perc_overlap, eps, min_samples) ---
+# Cada combinación se resume sin generar HTML. Entre combinaciones vecinas se reutiliza:
+#   * la asignación de cubos, una vez por (n_cubes, perc_overlap);
+#   * el grafo de vecinos, una sola búsqueda con el eps más grande y las distancias de
+#     cada par; un eps menor solo recorta las aristas (d <= eps) de cada cubo;
+#   * el recorte de cada cubo, que sirve para todos los min_samples.
+# Las etiquetas de cada cubo son las de DBSCAN (salvo redondeo justo en el borde eps).
+
+# Mismo criterio que eficiencia_ok: rendimiento_real / rendimiento < 0.6 es una carga mala
+UMBRAL_EFICIENCIA = 0.6
+# Un nodo es "de bajo rendimiento" si al menos la mitad de sus filas lo son
+FRACCION_NODO_BAJO = 0.5
+
+N_CUBES = (8, 10, 12, 15)
+PERC_OVERLAP = (0.3, 0.4, 0.5)
+EPS = (0.3, 0.4, 0.5, 0.6)
+MIN_SAMPLES = (3, 5, 10)
+
+# Estado de cada proceso del pool
+_DISTANCIAS = None
+_BAJO = None
+
+
+def _iniciar_barrido(distancias, bajo):
+    global _DISTANCIAS, _BAJO
+    _DISTANCIAS, _BAJO = distancias, bajo
+
+
+# Filas de df_mapper con bajo rendimiento real frente al esperado
+def filas_bajo_rendimiento(df_mapper, umbral=UMBRAL_EFICIENCIA):
+    return (df_mapper["rendimiento_real"] / df_mapper["rendimiento"] < umbral).to_numpy()
+
+
+# Estructura de los vecinos a distancia <= eps dentro del cubo (mismas filas, mismo orden)
+def recortar_eps(distancias, ids, eps):
+    submatriz = distancias[ids][:, ids]
+    dentro = submatriz.data <= eps
+    indptr = np.concatenate([[0], np.cumsum(dentro)])[submatriz.indptr]
+    return sparse.csr_matrix(
+        (np.ones(int(dentro.sum()), dtype=bool), submatriz.indices[dentro], indptr), shape=submatriz.shape
+    )
+
+
+# Resumen de un grafo: tamaño, conexidad y qué tan bien separa las cargas malas
+def resumen_grafo(nodes, bajo, min_intersection=1):
+    links, _ = calcular_nervio(nodes, min_intersection)
+    nombres = list(nodes)
+    posicion = {nombre: i for i, nombre in enumerate(nombres)}
+    origen = [posicion[a] for a in links for _ in links[a]]
+    destino = [posicion[b] for a in links for b in links[a]]
+    adyacencia = sparse.csr_matrix(
+        (np.ones(len(origen)), (origen, destino)), shape=(len(nombres), len(nombres))
+    )
+    n_componentes = connected_components(adyacencia, directed=False)[0] if nombres else 0
+
+    tamaños = np.array([len(nodes[nombre]) for nombre in nombres], dtype=np.int64)
+    bajas = np.array([bajo[nodes[nombre]].sum() for nombre in nombres], dtype=np.int64)
+    es_bajo = bajas >= FRACCION_NODO_BAJO * tamaños if nombres else np.zeros(0, dtype=bool)
+    cubiertas = np.unique(np.concatenate([nodes[nombre] for nombre in nombres] or [[]]).astype(np.int64))
+    en_bajos = np.unique(
+        np.concatenate([nodes[nombre] for nombre, b in zip(nombres, es_bajo) if b] or [[]]).astype(np.int64)
+    )
+    return {
+        "n_nodos": len(nombres),
+        "n_aristas": len(origen),
+        "n_componentes": n_componentes,
+        "filas_cubiertas": len(cubiertas) / max(len(bajo), 1),
+        "nodos_bajos": int(es_bajo.sum()),
+        # De las filas en nodos de bajo rendimiento, cuántas son cargas malas
+        "pureza_bajos": bajas[es_bajo].sum() / tamaños[es_bajo].sum() if es_bajo.any() else np.nan,
+        # De las cargas malas, cuántas quedaron en algún nodo de bajo rendimiento
+        "cobertura_bajos": bajo[en_bajos].sum() / max(int(bajo.sum()), 1),
+    }
+
+
+# Todas las combinaciones de min_samples para una cobertura y un eps
+def _evaluar(cubos, eps, lista_min_samples, min_intersection):
+    inicio = time.perf_counter()
+    vecinos = [recortar_eps(_DISTANCIAS, ids, eps) for _, ids in cubos]
+    recorte = time.perf_counter() - inicio
+
+    filas = []
+    for min_samples in lista_min_samples:
+        inicio = time.perf_counter()
+        con_filas = [k for k, (_, ids) in enumerate(cubos) if len(ids) >= min_samples]
+        etiquetas = [dbscan_en_grafo(vecinos[k], min_samples) for k in con_filas]
+        nodes = nodos_de_etiquetas([cubos[k] for k in con_filas], etiquetas)
+        fila = {"eps": eps, "min_samples": min_samples}
+        fila.update(resumen_grafo(nodes, _BAJO, min_intersection))
+        fila["segundos"] = time.perf_counter() - inicio + recorte / len(lista_min_samples)
+        filas.append(fila)
+    return filas
+
+
+# Evalúa la rejilla completa y regresa una fila por combinación. `bajo` marca las
+# filas de X con bajo rendimiento (ver filas_bajo_rendimiento); `cover` construye la
+# cobertura de cada (n_cubes, perc_overlap), p. ej. km.Cover
+def barrido(lens, X, bajo, cover, n_cubes=N_CUBES, perc_overlap=PERC_OVERLAP, eps=EPS,
+            min_samples=MIN_SAMPLES, min_intersection=1, n_procesos=None):
+    X = np.asarray(X)
+    bajo = np.asarray(bajo, dtype=bool)
+    n_procesos = n_procesos or os.cpu_count() or 1
+    min_samples = sorted(min_samples)
+
+    # Cubos de cada cobertura, una vez
+    coberturas = {
+        (n, p): cubos_cobertura(lens, cover(n_cubes=n, perc_overlap=p), min_samples[0])
+        for n, p in itertools.product(n_cubes, perc_overlap)
+    }
+
+    # Vecinos con el eps más grande, solo entre filas que comparten cubo en alguna cobertura
+    celda, pares = celdas_cobertura([ids for cubos in coberturas.values() for _, ids in cubos], len(X))
+    clusterer = DBSCAN(eps=max(eps))
+    if n_procesos == 1:
+        _iniciar_proceso(X, clusterer)
+        try:
+            distancias = grafo_vecinos(celda, pares, con_distancias=True)
+        finally:
+            _iniciar_proceso(None, None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_procesos, initializer=_iniciar_proceso, initargs=(X, clusterer)
+        ) as pool:
+            distancias = grafo_vecinos(celda, pares, pool, con_distancias=True)
+
+    tareas = [(clave, e) for clave in coberturas for e in sorted(eps)]
+    argumentos = (
+        [coberturas[clave] for clave, _ in tareas],
+        [e for _, e in tareas],
+        [min_samples] * len(tareas),
+        [min_intersection] * len(tareas),
+    )
+    if n_procesos == 1:
+        _iniciar_barrido(distancias, bajo)
+        try:
+            resultados = list(map(_evaluar, *argumentos))
+        finally:
+            _iniciar_barrido(None, None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_procesos, initializer=_iniciar_barrido, initargs=(distancias, bajo)
+        ) as pool:
+            resultados = list(pool.map(_evaluar, *argumentos))
+
+    filas = [
+        {"n_cubes": clave[0], "perc_overlap": clave[1], **fila}
+        for (clave, _), filas_tarea in zip(tareas, resultados) for fila in filas_tarea
+    ]
+    return pd.DataFrame(filas)
@@ -0,0 +1,92 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from limpieza import derivar_unidad
+
+# Filas de df_filtrado al momento de crear "Unidad" (4 años de transacciones)
+FILAS_BASE = 120_000
+ESCALAS = [1, 10, 100]
+# El lambda es lineal en filas: arriba de este tamaño se extrapola en lugar de medirlo
+MAX_FILAS_LAMBDA = 1_200_000
+
+
+# Derivación original del notebook, fila por fila
+def unidad_lambda(df):
+    return df.apply(
+        lambda row: row["vehículo"].replace(
+            row["identificador_vehículo"].replace(" ", ""), ""
+        ).replace(" ", "").upper().strip()
+        if isinstance(row["vehículo"], str) and isinstance(row["identificador_vehículo"], str)
+        else "SIN_DATO",
+        axis=1
+    )
+
+
+# Flota sintética con la forma de los datos de Edenred: "Unidad <VIN>" con espacios
+# sobrantes, identificadores con y sin espacios, nulos y valores no textuales
+def datos_ejemplo(n, n_unidades=800, semilla=42):
+    rng = np.random.default_rng(semilla)
+    vins = np.array([f"1FTFW1CD{i:05d}PFA9" for i in range(n_unidades)], dtype=object)
+    ids = np.array([f"{v[:5]} {v[5:9]}" if i % 2 else v[:9] for i, v in enumerate(vins)], dtype=object)
+    k = rng.integers(0, n_unidades, n)
+    vehiculo = "Unidad " + vins[k] + np.where(rng.random(n) < 0.3, "      ", "")
+    identificador = ids[k].copy()
+    identificador[rng.random(n) < 0.02] = np.nan
+    vehiculo[rng.random(n) < 0.01] = np.nan
+    identificador[rng.random(n) < 0.005] = 12345
+    return pd.DataFrame({"vehículo": vehiculo, "identificador_vehículo": identificador})
+
+
+def cronometrar(funcion, df):
+    inicio = time.perf_counter()
+    resultado = funcion(df)
+    return resultado, time.perf_counter() - inicio
+
+
+# Casos límite: nulos (None y NaN), identificador o vehículo vacíos, solo espacios,
+# identificador numérico y vehículo sin el identificador
+def casos_limite():
+    return pd.DataFrame({
+        "vehículo": [
+            "Unidad 1FTFW1CD4PFA98888", None, np.nan, "Unidad 1FTFW1CD4PFA98888", "",
+            "", "   ", "Unidad ABC", "Unidad 1FTFW 1CD4", "unidad abc 12345", None,
+        ],
+        "identificador_vehículo": [
+            "1FTFW1CD4", "1FTFW1CD4", "1FTFW1CD4", None, "1FTFW1CD4",
+            "", "", "", "1FTFW 1CD4", 12345, None,
+        ],
+    }, dtype=object)
+
+
+# Equivalencia exacta contra el lambda (casos límite y flota sintética); se corre sola
+# con python -m pytest bench_unidad.py o python bench_unidad.py --prueba
+def test_equivalencia_lambda():
+    for muestra in (casos_limite(), datos_ejemplo(20_000)):
+        esperado = unidad_lambda(muestra)
+        obtenido = derivar_unidad(muestra)
+        assert esperado.equals(obtenido.rename(None)), "derivar_unidad no coincide con el lambda original"
+        assert (obtenido == "SIN_DATO").any()
+
+
+if __name__ == "__main__":
+    test_equivalencia_lambda()
+    print("Equivalencia con el lambda: OK")
+    if "--prueba" in sys.argv[1:]:
+        sys.exit()
+
+    print(f"{'filas':>12} {'lambda (s)':>12} {'vectorizado (s)':>16} {'aceleración':>12}")
+    for escala in ESCALAS:
+        n = FILAS_BASE * escala
+        df = datos_ejemplo(n)
+        _, t_vec = cronometrar(derivar_unidad, df)
+        if n <= MAX_FILAS_LAMBDA:
+            _, t_lambda = cronometrar(unidad_lambda, df)
+            nota = ""
+        else:
+            _, t_parcial = cronometrar(unidad_lambda, df.iloc[:MAX_FILAS_LAMBDA])
+            t_lambda = t_parcial * n / MAX_FILAS_LAMBDA
+            nota = " (lambda extrapolado)"
+        print(f"{n:>12,} {t_lambda:>12.2f} {t_vec:>16.3f} {t_lambda / t_vec:>11.0f}x{nota}")
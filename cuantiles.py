@@ -0,0 +1,89 @@
+import json
+import os
+
+import numpy as np
+
+
+# Sketch de cuantiles para valores positivos con error relativo acotado (estilo DDSketch).
+# Cada valor x cae en la cubeta k = ceil(log_gamma(x)), con gamma = (1 + alfa) / (1 - alfa),
+# y la cubeta se representa con 2 * gamma**k / (gamma + 1). Así, cuantil(q) está a menos
+# de alfa * x de x, el elemento de orden floor(q * (n - 1)) de los datos, sin guardarlos:
+# la memoria depende del rango de valores (log(max / min) / log(gamma) cubetas), no de n.
+class SketchCuantiles:
+    def __init__(self, alfa=0.001):
+        self.alfa = alfa
+        self.gamma = (1 + alfa) / (1 - alfa)
+        self.log_gamma = np.log(self.gamma)
+        self.desplazamiento = 0
+        self.conteos = np.zeros(0, dtype=np.int64)
+        self.n = 0
+
+    # Amplía el arreglo de conteos para cubrir las cubetas [inicio, fin]
+    def _ampliar(self, inicio, fin):
+        if self.n == 0:
+            self.desplazamiento = inicio
+            self.conteos = np.zeros(fin - inicio + 1, dtype=np.int64)
+            return
+        actual_fin = self.desplazamiento + len(self.conteos) - 1
+        nuevo_inicio = min(inicio, self.desplazamiento)
+        nuevo_fin = max(fin, actual_fin)
+        if nuevo_inicio == self.desplazamiento and nuevo_fin == actual_fin:
+            return
+        conteos = np.zeros(nuevo_fin - nuevo_inicio + 1, dtype=np.int64)
+        conteos[self.desplazamiento - nuevo_inicio:actual_fin - nuevo_inicio + 1] = self.conteos
+        self.desplazamiento = nuevo_inicio
+        self.conteos = conteos
+
+    # Agrega un lote de valores; los nulos y los valores <= 0 se ignoran
+    def actualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[valores > 0]
+        if len(valores) == 0:
+            return self
+        cubetas = np.ceil(np.log(valores) / self.log_gamma).astype(np.int64)
+        self._ampliar(int(cubetas.min()), int(cubetas.max()))
+        self.conteos += np.bincount(cubetas - self.desplazamiento, minlength=len(self.conteos))
+        self.n += len(valores)
+        return self
+
+    # Combina con otro sketch del mismo alfa (p. ej. uno por año o por bloque)
+    def fusionar(self, otro):
+        if otro.alfa != self.alfa:
+            raise ValueError("Solo se pueden fusionar sketches con el mismo alfa.")
+        if otro.n == 0:
+            return self
+        self._ampliar(otro.desplazamiento, otro.desplazamiento + len(otro.conteos) - 1)
+        inicio = otro.desplazamiento - self.desplazamiento
+        self.conteos[inicio:inicio + len(otro.conteos)] += otro.conteos
+        self.n += otro.n
+        return self
+
+    def cuantil(self, q):
+        if self.n == 0:
+            return None
+        rango = q * (self.n - 1)
+        cubeta = int(np.searchsorted(np.cumsum(self.conteos), rango, side="right"))
+        return float(2 * self.gamma ** (cubeta + self.desplazamiento) / (self.gamma + 1))
+
+    def guardar(self, ruta):
+        datos = {
+            "alfa": self.alfa,
+            "desplazamiento": self.desplazamiento,
+            "n": self.n,
+            "conteos": self.conteos.tolist(),
+        }
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        os.replace(ruta + ".tmp", ruta)
+
+    @classmethod
+    def cargar(cls, ruta, alfa=0.001):
+        if not os.path.exists(ruta):
+            return cls(alfa)
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        sketch = cls(datos["alfa"])
+        sketch.desplazamiento = datos["desplazamiento"]
+        sketch.n = datos["n"]
+        sketch.conteos = np.asarray(datos["conteos"], dtype=np.int64)
+        return sketch
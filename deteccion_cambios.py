@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from distancias_diagramas import distancias_a_referencia
+from ventanas import DELAY, DIM, WINDOW_SIZE, fechas_ventanas, persistencia_ventanas
+
+# --- Detección de cambios en línea sobre la señal de deriva (distancias Wasserstein) ---
+# En lugar de promediar por mes y buscar picos con find_peaks al final, cada distancia
+# se procesa al llegar con un CUSUM de dos lados sobre la señal estandarizada:
+#   z = (x - media) / desviación, con media y varianza exponenciales (peso `alfa`);
+#   s_sube = max(0, s_sube + z - k), s_baja = max(0, s_baja - z - k);
+#   si alguno pasa de `h` se emite un evento y la línea base se vuelve a estimar con
+#   las siguientes observaciones (el nuevo nivel; ver CALENTAMIENTO).
+# La desviación tiene un piso relativo al nivel de la señal (DESVIACION_RELATIVA de la
+# media), así que una línea base casi constante no convierte ruido numérico en alarmas.
+# El estado es de tamaño fijo (unos cuantos números por detector) y un cambio de d
+# desviaciones se detecta en unas h / (d - k) observaciones. Las distancias de ventanas
+# traslapadas están muy correlacionadas, así que con `paso` > 1 el detector trabaja con
+# el promedio de cada `paso` observaciones (con paso = window_size, ventanas que ya no se
+# traslapan); la latencia queda acotada por paso * (h / (d - k)). Con DetectorPorGrupo
+# hay un detector por vehículo, división o cualquier clave.
+ALFA = 0.01
+K = 0.5
+H = 8.0
+# Observaciones (sin agrupar) para fijar la línea base antes de empezar (o volver) a
+# alertar. Con paso > 1 la línea base usa además al menos BLOQUES_BASE bloques para
+# estimar la varianza de los promedios, así que el calentamiento efectivo es
+# max(calentamiento, BLOQUES_BASE * paso) observaciones (observaciones_base)
+CALENTAMIENTO = 30
+BLOQUES_BASE = 10
+# Piso de la desviación, relativo a |media|
+DESVIACION_RELATIVA = 0.01
+
+
+class DetectorCambios:
+    def __init__(self, alfa=ALFA, k=K, h=H, calentamiento=CALENTAMIENTO, paso=1, bloques_base=BLOQUES_BASE):
+        self.alfa = alfa
+        self.k = k
+        self.h = h
+        self.calentamiento = calentamiento
+        self.paso = paso
+        # Bloques de la línea base: los que cubren `calentamiento` observaciones y, si se
+        # agrupa, al menos `bloques_base`
+        self.bloques_base = max(-(-calentamiento // paso), bloques_base if paso > 1 else 1)
+        # Observaciones que consume la línea base: la primera alarma puede llegar con la
+        # observación siguiente, al cerrar el primer bloque después de ellas
+        self.observaciones_base = self.bloques_base * paso
+        self.n = 0
+        # Bloque de `paso` observaciones en curso
+        self.suma = 0.0
+        self.cuenta = 0
+        self._reiniciar()
+
+    # Nueva línea base: las siguientes `observaciones_base` observaciones fijan media y varianza
+    def _reiniciar(self):
+        self.en_base = 0
+        self.media = 0.0
+        self.varianza = 0.0
+        self.s_sube = 0.0
+        self.s_baja = 0.0
+        # Última posición con el CUSUM en cero: estimación del inicio del cambio
+        self.inicio_sube = self.inicio_baja = self.n
+
+    # Procesa una observación; regresa un evento (dict) si se detectó un cambio o None
+    def actualizar(self, valor, fecha=None):
+        posicion = self.n
+        self.n += 1
+        if not np.isfinite(valor):
+            return None
+        self.suma += valor
+        self.cuenta += 1
+        if self.cuenta < self.paso:
+            return None
+        valor = self.suma / self.cuenta
+        self.suma, self.cuenta = 0.0, 0
+
+        # Línea base con media y varianza simples (Welford)
+        if self.en_base < self.bloques_base:
+            self.en_base += 1
+            delta = valor - self.media
+            self.media += delta / self.en_base
+            self.varianza += (delta * (valor - self.media) - self.varianza) / self.en_base
+            self.inicio_sube = self.inicio_baja = self.n
+            return None
+
+        desviacion = max(np.sqrt(self.varianza), DESVIACION_RELATIVA * abs(self.media)) or 1.0
+        z = (valor - self.media) / desviacion
+        self.s_sube = max(0.0, self.s_sube + z - self.k)
+        self.s_baja = max(0.0, self.s_baja - z - self.k)
+        if self.s_sube == 0.0:
+            self.inicio_sube = self.n
+        if self.s_baja == 0.0:
+            self.inicio_baja = self.n
+
+        if self.s_sube > self.h or self.s_baja > self.h:
+            sube = self.s_sube >= self.s_baja
+            evento = {
+                "posicion": posicion,
+                "fecha": fecha,
+                "inicio": self.inicio_sube if sube else self.inicio_baja,
+                "direccion": "sube" if sube else "baja",
+                "valor": valor,
+                "media_previa": self.media,
+                "estadistico": max(self.s_sube, self.s_baja),
+            }
+            self._reiniciar()
+            return evento
+
+        diferencia = valor - self.media
+        self.media += self.alfa * diferencia
+        self.varianza = (1 - self.alfa) * (self.varianza + self.alfa * diferencia ** 2)
+        return None
+
+    # Recorre una secuencia (p. ej. las distancias conforme se calculan) y regresa los eventos
+    def procesar(self, valores, fechas=None):
+        fechas = [None] * len(valores) if fechas is None else list(fechas)
+        eventos = []
+        for valor, fecha in zip(valores, fechas):
+            evento = self.actualizar(float(valor), fecha)
+            if evento is not None:
+                eventos.append(evento)
+        return eventos
+
+
+# Un detector independiente por clave, creado la primera vez que aparece la clave
+class DetectorPorGrupo:
+    def __init__(self, **parametros):
+        self.parametros = parametros
+        self.detectores = {}
+
+    def actualizar(self, clave, valor, fecha=None):
+        if clave not in self.detectores:
+            self.detectores[clave] = DetectorCambios(**self.parametros)
+        evento = self.detectores[clave].actualizar(valor, fecha)
+        if evento is not None:
+            evento = {"clave": clave, **evento}
+        return evento
+
+    # Filas (clave, valor, fecha) en el orden en que llegan; regresa los eventos como tabla
+    def procesar(self, claves, valores, fechas=None):
+        fechas = [None] * len(valores) if fechas is None else list(fechas)
+        eventos = []
+        for clave, valor, fecha in zip(claves, valores, fechas):
+            evento = self.actualizar(clave, float(valor), fecha)
+            if evento is not None:
+                eventos.append(evento)
+        return pd.DataFrame(eventos)
+
+
+# Señal de deriva de cada grupo (vehículo, división...) y sus eventos: la serie `columna`
+# del grupo ordenada por `fecha`, diagramas por ventanas, distancia de cada ventana a la
+# primera en la dimensión `homologia` y el detector del grupo sobre esas distancias (por
+# omisión con paso = window_size)
+def eventos_por_grupo(df, grupo, columna, fecha="fecha_mes", window_size=WINDOW_SIZE, delay=DELAY,
+                      dim=DIM, homologia=1, **parametros):
+    detector = DetectorPorGrupo(**{"paso": window_size, **parametros})
+    eventos = []
+    for clave, datos in df[[grupo, fecha, columna]].dropna().groupby(grupo, observed=True, sort=True):
+        datos = datos.sort_values(fecha, kind="stable")
+        if len(datos) < window_size:
+            continue
+        diagramas = persistencia_ventanas(
+            datos[columna].to_numpy(), window_size, delay, dim, maxdim=homologia, n_procesos=1
+        )
+        distancias = distancias_a_referencia([d[homologia] for d in diagramas], 0, n_procesos=1)
+        fechas = fechas_ventanas(datos[fecha].to_numpy(), window_size)
+        eventos.append(detector.procesar([clave] * len(distancias), distancias, fechas))
+    return pd.concat(eventos, ignore_index=True) if eventos else pd.DataFrame()
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+
+# --- Distancias entre diagramas de persistencia por lotes ---
+# Los diagramas se guardan rellenos en un solo arreglo (diagramas x puntos x 2, con NaN
+# en los puntos que sobran) y se comparan por pares (i, j) en bloques repartidos en un
+# pool de procesos. Así salen con la misma función las distancias contra una
+# referencia, entre ventanas consecutivas o la matriz completa.
+#   exacta: Wasserstein de orden 1 como persim.wasserstein (distancia L∞ entre puntos,
+#       (muerte - nacimiento) / 2 a la diagonal, asignación óptima con scipy);
+#   sliced: Wasserstein "sliced" (Carrière et al.), promedio sobre n_direcciones de la
+#       distancia en una dimensión entre las proyecciones de cada diagrama más la
+#       proyección a la diagonal del otro. Se vectoriza sobre todos los pares del bloque
+#       y es del mismo orden de magnitud que la exacta, útil para detectar cambios.
+N_DIRECCIONES = 50
+PARES_POR_BLOQUE = 512
+
+# Estado de cada proceso del pool
+_P = None
+
+
+def _iniciar_proceso(P):
+    global _P
+    _P = P
+
+
+# Diagramas (listas de [nacimiento, muerte]) a un arreglo relleno con NaN; los puntos
+# con muerte infinita no cuentan, igual que en persim
+def rellenar(diagramas):
+    finitos = [np.asarray(d, dtype=np.float64).reshape(-1, 2) for d in diagramas]
+    finitos = [d[np.isfinite(d[:, 1])] for d in finitos]
+    P = np.full((len(finitos), max([len(d) for d in finitos], default=0), 2), np.nan)
+    for i, d in enumerate(finitos):
+        P[i, :len(d)] = d
+    return P
+
+
+def _wasserstein(A, B):
+    A = A[~np.isnan(A[:, 0])]
+    B = B[~np.isnan(B[:, 0])]
+    m, n = len(A), len(B)
+    costo = np.zeros((m + n, m + n))
+    costo[:m, :n] = cdist(A, B, "chebyshev")
+    costo[:m, n:] = 0.5 * (A[:, 1] - A[:, 0])[:, None]
+    costo[m:, :n] = 0.5 * (B[:, 1] - B[:, 0])[None, :]
+    fila, columna = linear_sum_assignment(costo)
+    return costo[fila, columna].sum()
+
+
+def _a_diagonal(P):
+    media = P.mean(axis=2, keepdims=True)
+    return np.broadcast_to(media, P.shape)
+
+
+# Sliced Wasserstein de los pares (A[k], B[k]) a la vez. Cada lado se completa con la
+# proyección a la diagonal de los puntos del otro, así ambos tienen n_A + n_B puntos
+# válidos y, al ordenar (NaN al final), quedan alineados
+def _sliced(A, B, n_direcciones):
+    angulos = np.linspace(-np.pi / 2, np.pi / 2, n_direcciones, endpoint=False)
+    direcciones = np.stack([np.cos(angulos), np.sin(angulos)])
+    lado_a = np.concatenate([A, _a_diagonal(B)], axis=1) @ direcciones
+    lado_b = np.concatenate([B, _a_diagonal(A)], axis=1) @ direcciones
+    diferencias = np.abs(np.sort(lado_a, axis=1) - np.sort(lado_b, axis=1))
+    return np.nansum(diferencias, axis=1).mean(axis=1)
+
+
+def _distancias_bloque(i, j, metodo, n_direcciones):
+    if metodo == "sliced":
+        return _sliced(_P[i], _P[j], n_direcciones)
+    return np.array([_wasserstein(_P[a], _P[b]) for a, b in zip(i.tolist(), j.tolist())])
+
+
+# Distancia de cada par (i[k], j[k]) de diagramas; n_procesos=1 en el proceso actual
+def distancias(diagramas, i, j, metodo="exacta", n_direcciones=N_DIRECCIONES, n_procesos=None):
+    if metodo not in ("exacta", "sliced"):
+        raise ValueError(f"Método '{metodo}' no reconocido (exacta o sliced).")
+    P = diagramas if isinstance(diagramas, np.ndarray) else rellenar(diagramas)
+    i, j = np.asarray(i, dtype=np.int64), np.asarray(j, dtype=np.int64)
+    cortes = list(range(0, len(i), PARES_POR_BLOQUE))
+    argumentos = (
+        [i[c:c + PARES_POR_BLOQUE] for c in cortes],
+        [j[c:c + PARES_POR_BLOQUE] for c in cortes],
+        [metodo] * len(cortes),
+        [n_direcciones] * len(cortes),
+    )
+
+    n_procesos = n_procesos or os.cpu_count() or 1
+    if n_procesos == 1 or len(cortes) <= 1:
+        _iniciar_proceso(P)
+        try:
+            bloques = list(map(_distancias_bloque, *argumentos))
+        finally:
+            _iniciar_proceso(None)
+    else:
+        with ProcessPoolExecutor(max_workers=n_procesos, initializer=_iniciar_proceso, initargs=(P,)) as pool:
+            bloques = list(pool.map(_distancias_bloque, *argumentos))
+    return np.concatenate(bloques or [np.zeros(0)])
+
+
+# Distancia de cada diagrama a una referencia: la posición de un diagrama de la lista
+# (p. ej. 0, la primera ventana) o un diagrama aparte
+def distancias_a_referencia(diagramas, referencia=0, **kwargs):
+    diagramas = list(diagramas)
+    n = len(diagramas)
+    if not isinstance(referencia, (int, np.integer)):
+        diagramas.append(referencia)
+        referencia = n
+    return distancias(diagramas, np.arange(n), np.full(n, referencia), **kwargs)
+
+
+# Distancia entre cada ventana y la anterior (n - 1 valores)
+def distancias_consecutivas(diagramas, **kwargs):
+    n = len(diagramas)
+    return distancias(diagramas, np.arange(n - 1), np.arange(1, n), **kwargs)
+
+
+# Matriz simétrica n x n con todas las distancias entre diagramas
+def matriz_distancias(diagramas, **kwargs):
+    n = len(diagramas)
+    i, j = np.triu_indices(n, k=1)
+    matriz = np.zeros((n, n))
+    matriz[i, j] = matriz[j, i] = distancias(diagramas, i, j, **kwargs)
+    return matriz
@@ -0,0 +1,58 @@
+import pandas as pd
+
+# --- Esquema compacto de la tabla de transacciones ---
+# Campos de texto de baja cardinalidad (decenas o cientos de valores distintos en
+# decenas de miles de filas): categóricos, un código entero por fila más el diccionario
+CATEGORICAS = [
+    "conductor", "vehículo", "identificador_vehículo", "Unidad",
+    "division", "bl", "mercancía", "no_estación_pemex", "month",
+]
+
+# Numéricos con dos o tres decimales: float32 conserva 7 cifras significativas,
+# y XGBoost convierte sus entradas a float32 de todos modos
+FLOTANTES = [
+    "recorrido", "precio_unitario", "cantidad_mercancía", "rendimiento", "rendimiento_real",
+    "kg_c02", "eficiencia_relativa", "conductor_score", "vehiculo_score",
+    "rend_cond_mean", "rend_veh_mean",
+]
+
+ENTEROS = {"año": "int16", "eficiencia_ok": "int8"}
+
+
+def aplicar_esquema(df):
+    df = df.copy()
+    for col in df.columns.intersection(CATEGORICAS):
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    # Solo se reducen columnas que ya son numéricas; el texto se deja para to_numeric
+    for col in df.columns.intersection(FLOTANTES):
+        if pd.api.types.is_float_dtype(df[col]) or pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+    for col, tipo in ENTEROS.items():
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype(tipo)
+    return df
+
+
+# pd.concat de tablas con el esquema (p. ej. los años del caché). Un categórico con
+# categorías distintas en cada tabla saldría de pd.concat como object: antes se le da a
+# todas la misma lista de categorías (la unión, en orden de aparición)
+def concatenar(dfs, **kwargs):
+    dfs = list(dfs)
+    for col in CATEGORICAS:
+        con_col = [i for i, df in enumerate(dfs) if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)]
+        if len(con_col) < 2:
+            continue
+        categorias = pd.Index(
+            [valor for i in con_col for valor in dfs[i][col].cat.categories], dtype=object
+        ).unique()
+        for i in con_col:
+            dfs[i] = dfs[i].assign(**{col: dfs[i][col].cat.set_categories(categorias)})
+    return pd.concat(dfs, **kwargs)
+
+
+# Lectura de los CSV exportados (df_modelo.csv, df_malos_contexto.csv...). Los
+# categóricos se leen como texto, tal como los vio el modelo al entrenarse con astype(str)
+def leer_csv(ruta):
+    df = pd.read_csv(ruta, dtype={col: "category" for col in CATEGORICAS})
+    return aplicar_esquema(df)
@@ -0,0 +1,170 @@
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from barrido_mapper import filas_bajo_rendimiento, resumen_grafo
+from indice_nodos import COLUMNAS_COLOR, IndiceNodos, estadisticas_nodos
+
+# --- Exportación compacta del grafo Mapper para el dashboard ---
+# En lugar del HTML de mapper.visualize (tooltips, cinco funciones de color y D3 en
+# línea, ~900 KB) se guardan dos archivos:
+#   * mapper_grafo.json: nodos (nombre, tamaño, posición, medias por columna y fracción
+#     de filas de bajo rendimiento), aristas como pares de posiciones y un resumen.
+#     Pesa kilobytes y basta para dibujar el grafo.
+#   * mapper_detalle.parquet: las filas de df_filtrado que caen en algún nodo, con la
+#     columna `fila` (índice de df_filtrado). Se lee solo cuando se pide un nodo, con
+#     las filas de ese nodo sacadas del índice CSR (df_mapper_index).
+RUTA_GRAFO = "mapper_grafo.json"
+RUTA_DETALLE = "mapper_detalle.parquet"
+
+COLUMNAS_DETALLE = [
+    "conductor", "Unidad", "rendimiento", "rendimiento_real", "precio_unitario",
+    "cantidad_mercancía", "kg_c02",
+]
+DECIMALES = 4
+
+
+def _redondear(valores):
+    return [None if np.isnan(v) else v for v in np.round(np.asarray(valores, dtype=float), DECIMALES).tolist()]
+
+
+def _a_json(valor):
+    if isinstance(valor, (np.integer, int)):
+        return int(valor)
+    valor = float(valor)
+    return None if np.isnan(valor) else round(valor, DECIMALES)
+
+
+# Posiciones 2D de los nodos con Fruchterman-Reingold (repulsión entre todos los nodos,
+# atracción por arista y un poco de gravedad para que las componentes sueltas no se
+# alejen). Se calcula una vez al exportar para que el dashboard no haga layout.
+def posiciones_resorte(n, aristas, iteraciones=200, semilla=0):
+    if n == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(semilla)
+    pos = rng.random((n, 2))
+    k = np.sqrt(1.0 / n)
+    aristas = np.asarray(aristas, dtype=np.int64).reshape(-1, 2)
+    temperatura = 0.1
+    for paso in range(iteraciones):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distancia = np.maximum(np.linalg.norm(delta, axis=2), 0.01)
+        desplazamiento = (delta * (k ** 2 / distancia ** 2)[:, :, None]).sum(axis=1)
+
+        if len(aristas):
+            d = pos[aristas[:, 0]] - pos[aristas[:, 1]]
+            fuerza = d * (np.linalg.norm(d, axis=1, keepdims=True) / k)
+            np.add.at(desplazamiento, aristas[:, 0], -fuerza)
+            np.add.at(desplazamiento, aristas[:, 1], fuerza)
+        desplazamiento -= 0.1 * (pos - pos.mean(axis=0))
+
+        largo = np.maximum(np.linalg.norm(desplazamiento, axis=1, keepdims=True), 1e-9)
+        pos += desplazamiento / largo * np.minimum(largo, temperatura)
+        temperatura = 0.1 * (1 - (paso + 1) / iteraciones) + 1e-3
+
+    pos -= pos.min(axis=0)
+    return pos / np.maximum(pos.max(axis=0), 1e-9)
+
+
+def _escribir_json(datos, ruta):
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(ruta + ".tmp", ruta)
+
+
+# Grafo de construir_grafo / mapper.map (posiciones dentro de df_mapper) a JSON compacto
+def exportar_grafo(graph, df_mapper, ruta=RUTA_GRAFO, columnas=COLUMNAS_COLOR):
+    nodes = graph["nodes"]
+    nombres = list(nodes)
+    posicion = {nombre: i for i, nombre in enumerate(nombres)}
+    aristas = [[posicion[a], posicion[b]] for a in graph["links"] for b in graph["links"][a]]
+
+    # Medias por nodo con la misma tabla de estadísticas del índice, sobre posiciones de df_mapper
+    bajo = filas_bajo_rendimiento(df_mapper)
+    por_posicion = df_mapper[list(columnas)].reset_index(drop=True).assign(bajo=bajo.astype(float))
+    tabla = estadisticas_nodos(
+        IndiceNodos.desde_diccionario(nodes), por_posicion, list(columnas) + ["bajo"], ["average"]
+    )
+    pos = posiciones_resorte(len(nombres), aristas)
+    resumen = resumen_grafo(nodes, bajo, graph["meta_data"].get("nerve_min_intersection", 1))
+
+    datos = {
+        "meta": {**graph["meta_data"], "n_filas": len(df_mapper), "escala": "original"},
+        "resumen": {clave: _a_json(valor) for clave, valor in resumen.items()},
+        "columnas": list(columnas),
+        "nodos": {
+            "nombre": nombres,
+            "tamaño": tabla["tamaño"].tolist(),
+            "x": _redondear(pos[:, 0]),
+            "y": _redondear(pos[:, 1]),
+            "media": {col: _redondear(tabla[f"{col}_average"]) for col in columnas},
+            "frac_bajo": _redondear(tabla["bajo_average"]),
+        },
+        "aristas": aristas,
+    }
+    _escribir_json(datos, ruta)
+    return datos
+
+
+# Filas de df_filtrado que aparecen en algún nodo, para el detalle bajo demanda
+def exportar_detalle(df_filtrado, indice, ruta=RUTA_DETALLE, columnas=COLUMNAS_DETALLE):
+    filas = np.unique(np.asarray(indice.miembros))
+    columnas = [col for col in columnas if col in df_filtrado.columns]
+    detalle = df_filtrado.loc[filas, columnas].rename_axis("fila").reset_index()
+    # Sin pasar por ingesta: el dashboard solo necesita pyarrow
+    pq.write_table(pa.Table.from_pandas(detalle, preserve_index=False), ruta + ".tmp", compression="zstd")
+    os.replace(ruta + ".tmp", ruta)
+    return len(detalle)
+
+
+# Mismo esquema a partir de un HTML ya generado por mapper.visualize, para no depender
+# del notebook. Las medias son las que KeplerMapper guarda en el HTML (color "average",
+# con cada columna escalada a [0, 1]) y la fracción de bajo rendimiento no se conoce
+def desde_html_kepler(ruta_html, indice, ruta=RUTA_GRAFO, columnas=COLUMNAS_COLOR):
+    with open(ruta_html, "r", encoding="utf-8") as f:
+        html = f.read()
+    inicio = html.index("const graph = ") + len("const graph = ")
+    grafo, _ = json.JSONDecoder().raw_decode(html[inicio:])
+
+    nombres = [nodo["name"] for nodo in grafo["nodes"]]
+    aristas = [[arista["source"], arista["target"]] for arista in grafo["links"]]
+    tamaños = [len(indice.filas(nombre)) for nombre in nombres]
+    promedios = np.array([nodo["color"][0] for nodo in grafo["nodes"]], dtype=float).reshape(len(nombres), -1)
+    pos = posiciones_resorte(len(nombres), aristas)
+
+    nodes = {nombre: indice.filas(nombre) for nombre in nombres}
+    resumen = resumen_grafo(nodes, np.zeros(int(np.max(indice.miembros)) + 1, dtype=bool))
+    datos = {
+        "meta": {"origen": os.path.basename(ruta_html), "n_filas": int(len(np.unique(indice.miembros))), "escala": "minmax"},
+        "resumen": {
+            clave: _a_json(valor) for clave, valor in resumen.items()
+            if clave in ("n_nodos", "n_aristas", "n_componentes")
+        },
+        "columnas": list(columnas),
+        "nodos": {
+            "nombre": nombres,
+            "tamaño": tamaños,
+            "x": _redondear(pos[:, 0]),
+            "y": _redondear(pos[:, 1]),
+            "media": {col: _redondear(promedios[:, j]) for j, col in enumerate(columnas)},
+            "frac_bajo": [None] * len(nombres),
+        },
+        "aristas": aristas,
+    }
+    _escribir_json(datos, ruta)
+    return datos
+
+
+def leer_grafo(ruta=RUTA_GRAFO):
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Filas de un nodo (índices de df_filtrado, p. ej. IndiceNodos.filas) desde el Parquet
+# de detalle; solo se leen los grupos de filas que pueden contenerlas
+def leer_detalle(filas, ruta=RUTA_DETALLE):
+    filtro = [("fila", "in", np.asarray(filas, dtype=np.int64).tolist())]
+    return pq.read_table(ruta, filters=filtro, memory_map=True).to_pandas()
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+# --- Homología persistente por grupo (H0 con árbol de expansión mínima) ---
+# En el filtrado de Rips todas las clases de H0 nacen en 0 y mueren cuando una arista
+# une dos componentes: las muertes son exactamente las aristas del árbol de expansión
+# mínima euclidiano. Con Prim vectorizado el diagrama H0 sale en O(n²) operaciones y
+# O(n) memoria, sin la matriz de distancias ni el complejo de Rips (H1) que ripser
+# construye con maxdim=1 y luego se descartaba. Igual que ripser, las barras de
+# persistencia cero (filas repetidas) no se cuentan y queda una barra infinita.
+FEATURES_H0 = ["recorrido", "precio_unitario", "cantidad_mercancía"]
+MIN_FILAS = 5
+
+
+# Muertes finitas de H0 (aristas del árbol de expansión mínima) de las filas de X, sin ordenar
+def muertes_h0(X):
+    X = np.array(X, dtype=np.float64)
+    n = len(X)
+    muertes = np.empty(max(n - 1, 0))
+    if n <= 1:
+        return muertes
+
+    # Prim sobre los puntos que faltan: `distancia` es la distancia de cada uno al árbol,
+    # y el punto que entra se cambia por el último para trabajar siempre con un prefijo
+    distancia = np.sqrt(np.square(X[1:] - X[0]).sum(axis=1))
+    X = X[1:]
+    for m in range(n - 1, 0, -1):
+        j = np.argmin(distancia[:m])
+        muertes[n - 1 - m] = distancia[j]
+        punto = X[j].copy()
+        X[j], distancia[j] = X[m - 1], distancia[m - 1]
+        np.minimum(distancia[:m - 1], np.sqrt(np.square(X[:m - 1] - punto).sum(axis=1)), out=distancia[:m - 1])
+    return muertes
+
+
+# Diagrama de persistencia de una sola dimensión: H0 con el árbol de expansión mínima
+# (incluye la barra infinita) y, para dim >= 1, ripser solo hasta esa dimensión
+def diagrama(X, dim=0):
+    if dim == 0:
+        muertes = np.sort(muertes_h0(X))
+        muertes = muertes[muertes > 0]
+        finitas = np.c_[np.zeros(len(muertes)), muertes]
+        return np.vstack([finitas, [[0.0, np.inf]]]) if len(X) else finitas
+    from ripser import ripser
+
+    return ripser(np.asarray(X), maxdim=dim)["dgms"][dim]
+
+
+# Métricas de df_topologia a partir de las muertes finitas de H0
+def resumen_h0(muertes):
+    muertes = muertes[muertes > 0]
+    return {
+        "Suma_Persistencias_H0": float(muertes.sum()),
+        "Num_Componentes_H0": len(muertes) + 1,
+        "Max_Persistencia_H0": float(muertes.max(initial=0.0)),
+    }
+
+
+def _h0_grupo(datos):
+    return resumen_h0(muertes_h0(StandardScaler().fit_transform(datos)))
+
+
+# df_topologia: una fila por grupo con al menos min_filas filas completas en `features`
+# (estandarizadas dentro del grupo), el rendimiento real medio del grupo y las métricas
+# H0. Los grupos se reparten en un pool de procesos, los más grandes primero;
+# n_procesos=1 los calcula en el proceso actual
+def topologia_por_grupo(df, grupo="Unidad", features=FEATURES_H0, min_filas=MIN_FILAS, n_procesos=None):
+    claves = [grupo] if isinstance(grupo, str) else list(grupo)
+    completas = df[claves + list(features)].dropna(subset=list(features))
+    conteos = completas.groupby(claves, observed=True).size()
+    conteos = conteos[conteos >= min_filas]
+
+    # Filas de cada grupo contiguas (orden estable), para pasar solo arreglos al pool
+    completas = completas.set_index(claves).loc[conteos.index].sort_index(kind="stable")
+    valores = completas[list(features)].to_numpy(dtype=np.float64)
+    inicios = np.concatenate([[0], np.cumsum(conteos.to_numpy())])
+    datos = [valores[a:b] for a, b in zip(inicios[:-1], inicios[1:])]
+
+    n_procesos = n_procesos or os.cpu_count() or 1
+    orden = np.argsort(-conteos.to_numpy(), kind="stable")
+    if n_procesos == 1 or len(datos) <= 1:
+        resultados = [_h0_grupo(d) for d in datos]
+    else:
+        with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+            por_tamaño = list(pool.map(_h0_grupo, [datos[i] for i in orden]))
+        resultados = [None] * len(datos)
+        for i, resultado in zip(orden, por_tamaño):
+            resultados[i] = resultado
+
+    rendimiento = df.groupby(claves, observed=True)["rendimiento_real"].mean()
+    df_topologia = pd.DataFrame(resultados, index=conteos.index)
+    df_topologia.insert(0, "Rendimiento", rendimiento.reindex(conteos.index).to_numpy())
+    return df_topologia.reset_index()
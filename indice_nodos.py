@@ -0,0 +1,163 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- Índice nodo -> filas del grafo Mapper en formato CSR ---
+# miembros[offsets[i]:offsets[i + 1]] son las filas (índice de df_filtrado) del nodo i.
+# El índice inverso usa la misma idea por fila: nodos_inv[offsets_inv[r]:offsets_inv[r + 1]]
+# son los nodos que contienen la fila r. Los arreglos se guardan como .npy y se abren
+# con mmap, así que consultar un nodo o una fila no deserializa el índice completo.
+DIR_INDICE = "df_mapper_index"
+ARREGLOS = ["offsets", "miembros", "offsets_inv", "nodos_inv"]
+
+# Estadísticas por nodo de las columnas de color (las node_color_function de visualize),
+# guardadas junto al índice para no volver a recorrer las filas de cada nodo
+ESTADISTICAS = "estadisticas.parquet"
+COLUMNAS_COLOR = ["rendimiento_real", "rendimiento", "precio_unitario", "recorrido", "cantidad_mercancía"]
+FUNCIONES_COLOR = ["average", "std", "sum", "max", "min"]
+
+
+# int32 mientras alcance: la mitad de bytes en disco y en memoria
+def entero_compacto(arreglo):
+    if len(arreglo) == 0 or int(arreglo.max()) < np.iinfo(np.int32).max:
+        return arreglo.astype(np.int32)
+    return arreglo.astype(np.int64)
+
+
+class IndiceNodos:
+    def __init__(self, nombres, offsets, miembros, offsets_inv, nodos_inv):
+        self.nombres = list(nombres)
+        self.posiciones = {nombre: i for i, nombre in enumerate(self.nombres)}
+        self.offsets = offsets
+        self.miembros = miembros
+        self.offsets_inv = offsets_inv
+        self.nodos_inv = nodos_inv
+
+    # A partir de {nodo: [filas]}, el formato del antiguo df_mapper_index.pkl
+    @classmethod
+    def desde_diccionario(cls, miembros):
+        nombres = list(miembros)
+        tamaños = np.array([len(miembros[nombre]) for nombre in nombres], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(tamaños)])
+        filas = np.concatenate(
+            [np.sort(np.asarray(miembros[nombre], dtype=np.int64)) for nombre in nombres]
+            or [np.empty(0, dtype=np.int64)]
+        )
+
+        # Índice inverso: los nodos de cada fila, agrupados por fila con un argsort estable
+        nodo_de_cada_fila = np.repeat(np.arange(len(nombres), dtype=np.int32), tamaños)
+        orden = np.argsort(filas, kind="stable")
+        conteos = np.bincount(filas, minlength=int(filas.max()) + 1 if len(filas) else 0)
+        offsets_inv = np.concatenate([[0], np.cumsum(conteos)])
+        return cls(
+            nombres,
+            entero_compacto(offsets),
+            entero_compacto(filas),
+            entero_compacto(offsets_inv),
+            nodo_de_cada_fila[orden],
+        )
+
+    # A partir del grafo de KeplerMapper: graph["nodes"] guarda posiciones dentro de
+    # df_mapper, que se traducen a etiquetas de df_filtrado con df_mapper.index
+    @classmethod
+    def desde_grafo(cls, graph, indice_filas):
+        indice_filas = np.asarray(indice_filas)
+        return cls.desde_diccionario(
+            {nombre: indice_filas[posiciones] for nombre, posiciones in graph["nodes"].items()}
+        )
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def __contains__(self, nombre):
+        return nombre in self.posiciones
+
+    # Filas del nodo (vista del arreglo, sin copiar)
+    def filas(self, nombre):
+        i = self.posiciones[nombre]
+        return self.miembros[self.offsets[i]:self.offsets[i + 1]]
+
+    # Posiciones de los nodos que contienen la fila r
+    def posiciones_nodos(self, fila):
+        if fila < 0 or fila + 1 >= len(self.offsets_inv):
+            return self.nodos_inv[:0]
+        return self.nodos_inv[self.offsets_inv[fila]:self.offsets_inv[fila + 1]]
+
+    def nodos(self, fila):
+        return [self.nombres[i] for i in self.posiciones_nodos(fila)]
+
+    def tamaños(self):
+        return np.diff(self.offsets)
+
+    # Unión (ordenada y sin repetidos) de las filas de varios nodos, sin recorrerlos uno a uno
+    def filas_de(self, nombres):
+        marcados = np.zeros(len(self.nombres), dtype=bool)
+        marcados[[self.posiciones[nombre] for nombre in nombres]] = True
+        return np.unique(np.asarray(self.miembros)[np.repeat(marcados, self.tamaños())])
+
+    def a_diccionario(self):
+        return {nombre: self.filas(nombre).tolist() for nombre in self.nombres}
+
+    def guardar(self, directorio=DIR_INDICE):
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in ARREGLOS:
+            np.save(os.path.join(directorio, f"{nombre}.npy"), getattr(self, nombre))
+        with open(os.path.join(directorio, "nombres.json"), "w", encoding="utf-8") as f:
+            json.dump(self.nombres, f, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, directorio=DIR_INDICE, mmap=True):
+        with open(os.path.join(directorio, "nombres.json"), "r", encoding="utf-8") as f:
+            nombres = json.load(f)
+        modo = "r" if mmap else None
+        arreglos = [np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode=modo) for nombre in ARREGLOS]
+        return cls(nombres, *arreglos)
+
+
+# Tabla nodo x (columna, función) con una sola pasada sobre el índice: las filas de todos
+# los nodos están concatenadas en `miembros`, así que cada estadística es un reduceat
+# por tramos de offsets. std es la poblacional (ddof=0), como np.std en visualize.
+# `df` es cualquier tabla indexada como df_filtrado (p. ej. df_filtrado o df_mapper)
+def estadisticas_nodos(indice, df, columnas=COLUMNAS_COLOR, funciones=FUNCIONES_COLOR):
+    posiciones = df.index.get_indexer(np.asarray(indice.miembros))
+    if (posiciones < 0).any():
+        raise KeyError("Hay filas del índice que no están en la tabla.")
+    valores = df[columnas].to_numpy(dtype=float)[posiciones]
+    tamaños = np.asarray(indice.tamaños())
+    inicios = np.asarray(indice.offsets[:-1])
+
+    calculos = {}
+    if len(tamaños):
+        calculos["sum"] = np.add.reduceat(valores, inicios, axis=0)
+        calculos["average"] = calculos["sum"] / tamaños[:, None]
+        desviaciones = valores - np.repeat(calculos["average"], tamaños, axis=0)
+        calculos["std"] = np.sqrt(np.add.reduceat(desviaciones ** 2, inicios, axis=0) / tamaños[:, None])
+        calculos["max"] = np.maximum.reduceat(valores, inicios, axis=0)
+        calculos["min"] = np.minimum.reduceat(valores, inicios, axis=0)
+    else:
+        calculos = {funcion: np.zeros((0, len(columnas))) for funcion in FUNCIONES_COLOR}
+
+    tabla = {"tamaño": tamaños}
+    for j, col in enumerate(columnas):
+        for funcion in funciones:
+            tabla[f"{col}_{funcion}"] = calculos[funcion][:, j]
+    return pd.DataFrame(tabla, index=pd.Index(indice.nombres, name="nodo"))
+
+
+def guardar_estadisticas(tabla, directorio=DIR_INDICE):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, ESTADISTICAS)
+    pq.write_table(pa.Table.from_pandas(tabla, preserve_index=True), ruta + ".tmp", compression="zstd")
+    os.replace(ruta + ".tmp", ruta)
+
+
+# Solo las columnas pedidas (p. ej. ["rendimiento_real_average"]), con el nodo como índice
+def cargar_estadisticas(directorio=DIR_INDICE, columnas=None):
+    tabla = pq.read_table(
+        os.path.join(directorio, ESTADISTICAS), columns=columnas, memory_map=True, use_pandas_metadata=True
+    )
+    return tabla.to_pandas()
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from esquema import aplicar_esquema, concatenar
+from limpieza import derivar_unidad, limpiar_edenred
+
+# --- Configuración de la ingesta ---
+AÑOS = [2021, 2022, 2023, 2024]
+DIR_CACHE = "cache_edenred"
+MANIFIESTO = "manifiesto.json"
+
+# Subir este número cuando cambie limpiar_edenred o el esquema: invalida todos los años del caché
+VERSION_LIMPIEZA = 4
+
+# Tipos que pyarrow convierte sin ayuda desde una columna object
+TIPOS_PARQUET = {
+    "string", "empty", "integer", "floating", "mixed-integer-float", "boolean",
+    "datetime", "datetime64", "date", "time", "bytes", "decimal",
+}
+
+
+# Libro de cada año: "Edenred 2021.xlsx" o, si no existe, la copia del repo (D21.xlsx)
+def ruta_libro(año):
+    ruta = f"Edenred {año}.xlsx"
+    if os.path.exists(ruta):
+        return ruta
+    return f"D{año % 100:02d}.xlsx"
+
+
+def hash_archivo(ruta, tamaño_bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tamaño_bloque), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def clave_libro(ruta):
+    return f"{hash_archivo(ruta)}-v{VERSION_LIMPIEZA}"
+
+
+# Las columnas object con tipos mezclados (números y texto, horas y texto...)
+# no caben en Parquet: se guardan como texto conservando los nulos. Lo mismo para
+# las categorías mezcladas de un categórico, que se guarda como diccionario
+def tipar_para_parquet(df):
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) not in TIPOS_PARQUET:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    for col in df.columns[[isinstance(tipo, pd.CategoricalDtype) for tipo in df.dtypes]]:
+        if pd.api.types.infer_dtype(df[col].cat.categories, skipna=True) not in TIPOS_PARQUET:
+            df[col] = df[col].astype(str).where(df[col].notna()).astype("category")
+    return df
+
+
+def escribir_parquet(df, ruta, preserve_index=None):
+    tabla = pa.Table.from_pandas(tipar_para_parquet(df), preserve_index=preserve_index)
+    temporal = ruta + ".tmp"
+    pq.write_table(tabla, temporal, compression="zstd")
+    os.replace(temporal, ruta)
+
+
+def leer_parquet(ruta, columnas=None):
+    return pq.read_table(ruta, columns=columnas, memory_map=True).to_pandas()
+
+
+def leer_manifiesto(dir_cache=DIR_CACHE):
+    ruta = os.path.join(dir_cache, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_manifiesto(manifiesto, dir_cache=DIR_CACHE):
+    ruta = os.path.join(dir_cache, MANIFIESTO)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def ruta_parquet(año, dir_cache=DIR_CACHE):
+    return os.path.join(dir_cache, f"edenred_{año}.parquet")
+
+
+# Textos que pd.read_excel interpreta como nulos (na_values por omisión de pandas)
+TEXTOS_NULOS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+# Encabezados como los deja pd.read_excel: vacíos -> "Unnamed: i", repetidos -> "col.1"
+def nombres_columnas(encabezado):
+    nombres, vistos = [], {}
+    for i, nombre in enumerate(encabezado):
+        nombre = f"Unnamed: {i}" if nombre is None else str(nombre)
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+
+# Igual que pd.read_excel con openpyxl: celdas vacías y textos nulos como NaN,
+# flotantes enteros como int
+def valor_celda(valor):
+    if valor is None or (isinstance(valor, str) and valor in TEXTOS_NULOS):
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+# Recorre la primera hoja de un libro en bloques de filas sin cargarlo completo
+# (modo read_only de openpyxl); cada bloque es un DataFrame con los encabezados del libro
+def iterar_libro(ruta, filas_por_bloque=50_000):
+    import openpyxl
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        columnas = nombres_columnas(next(filas, ()))
+        bloque = []
+        for fila in filas:
+            if all(valor is None for valor in fila):
+                continue
+            bloque.append([valor_celda(valor) for valor in fila[:len(columnas)]])
+            if len(bloque) == filas_por_bloque:
+                yield pd.DataFrame(bloque, columns=columnas)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=columnas)
+    finally:
+        libro.close()
+
+
+# Lee un libro de Excel, lo limpia y lo guarda como Parquet.
+# Regresa solo la ruta para no mandar el DataFrame de vuelta entre procesos
+def convertir_año(año, ruta, dir_cache=DIR_CACHE):
+    df = pd.read_excel(ruta, engine="openpyxl")
+    df_clean = limpiar_edenred(df, año)
+    # Unidad se deriva aquí, con los tipos del libro: tipar_para_parquet pasa a texto los
+    # números de las columnas mezcladas, y un identificador numérico (12345) debe seguir
+    # dando SIN_DATO, no la clave "12345"
+    df_clean["Unidad"] = derivar_unidad(df_clean)
+    # Ya con el esquema compacto: los categóricos quedan como diccionario en el Parquet
+    df_clean = aplicar_esquema(df_clean)
+    destino = ruta_parquet(año, dir_cache)
+    escribir_parquet(df_clean, destino)
+    return destino
+
+
+# Años cuyo libro cambió (o que nunca se convirtieron)
+def años_pendientes(años=AÑOS, dir_cache=DIR_CACHE):
+    manifiesto = leer_manifiesto(dir_cache)
+    pendientes = {}
+    for año in años:
+        ruta = ruta_libro(año)
+        clave = clave_libro(ruta)
+        entrada = manifiesto.get(str(año), {})
+        if entrada.get("clave") != clave or not os.path.exists(ruta_parquet(año, dir_cache)):
+            pendientes[año] = (ruta, clave)
+    return pendientes
+
+
+# Reconstruye solo los años cuyo libro cambió; regresa la lista de años reconstruidos.
+# Los años son independientes: se convierten a la vez en un pool de procesos
+# (n_procesos=1 los convierte uno tras otro en el proceso actual)
+def actualizar_cache(años=AÑOS, dir_cache=DIR_CACHE, n_procesos=None):
+    os.makedirs(dir_cache, exist_ok=True)
+    pendientes = años_pendientes(años, dir_cache)
+    manifiesto = leer_manifiesto(dir_cache)
+    if n_procesos == 1 or len(pendientes) <= 1:
+        for año, (ruta, clave) in pendientes.items():
+            convertir_año(año, ruta, dir_cache)
+            manifiesto[str(año)] = {"libro": ruta, "clave": clave}
+            guardar_manifiesto(manifiesto, dir_cache)
+        return list(pendientes)
+
+    with ProcessPoolExecutor(max_workers=n_procesos or min(len(pendientes), os.cpu_count() or 1)) as pool:
+        futuros = {
+            año: pool.submit(convertir_año, año, ruta, dir_cache)
+            for año, (ruta, _) in pendientes.items()
+        }
+        # El manifiesto solo lo escribe el proceso principal
+        for año, futuro in futuros.items():
+            futuro.result()
+            manifiesto[str(año)] = {"libro": pendientes[año][0], "clave": pendientes[año][1]}
+            guardar_manifiesto(manifiesto, dir_cache)
+    return list(pendientes)
+
+
+# Un año del caché con el esquema compacto (categóricos, float32 y enteros chicos)
+def cargar_año(año, dir_cache=DIR_CACHE):
+    return aplicar_esquema(leer_parquet(ruta_parquet(año, dir_cache)))
+
+
+# Equivalente a concatenar e21_clean..e24_clean, leyendo del caché.
+# El orden de la concatenación es siempre el de `años`, sin importar qué proceso termine primero
+def cargar_edenred(años=AÑOS, dir_cache=DIR_CACHE, n_procesos=None):
+    actualizar_cache(años, dir_cache, n_procesos)
+    return concatenar([cargar_año(año, dir_cache) for año in años], ignore_index=True)
+
+
+if __name__ == "__main__":
+    reconstruidos = actualizar_cache()
+    if reconstruidos:
+        print(f"Años reconstruidos: {reconstruidos}")
+    else:
+        print("Caché al día, no se reconstruyó ningún año.")
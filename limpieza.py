@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Abreviaturas de mes de los libros Edenred
+MESES_ES = {
+    "Ene": 1, "Feb": 2, "Mar": 3, "Abr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Ago": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dic": 12,
+}
+# Columnas de mes que agrega la limpieza (derivadas de month y año)
+COLUMNAS_MES = ["mes_clave", "fecha_mes"]
+
+
+#  limpieza
+def limpiar_edenred(df, año):
+    df.columns = df.columns.str.strip().str.replace("  ", " ").str.replace(" ", "_").str.lower()
+    df["año"] = año
+    posibles_fechas = [col for col in df.columns if "fecha" in col or "transaccion" in col]
+    if posibles_fechas:
+        df["fecha"] = pd.to_datetime(df[posibles_fechas[0]], errors="coerce", dayfirst=True)
+    if "month" in df.columns:
+        df[COLUMNAS_MES] = derivar_mes(df)
+    df = df.dropna(axis=1, how='all')
+    df = df.drop_duplicates()
+    posibles_conceptos = [col for col in df.columns if "concepto" in col or "tipo" in col]
+    if posibles_conceptos:
+        df = df[~df[posibles_conceptos[0]].str.contains("bonif|ajuste|admin", case=False, na=False)]
+    return df
+
+
+# Mes de cada fila en un solo paso vectorizado: mes_clave = año * 12 + mes (entero, para
+# agrupar y ordenar) y fecha_mes, el primer día del mes como datetime64 (para graficar y
+# remuestrear). El nombre del mes se traduce una vez por valor distinto; las filas sin
+# mes reconocible quedan en <NA> / NaT
+def derivar_mes(df, col_mes="month", col_año="año"):
+    codigos, nombres = pd.factorize(df[col_mes])
+    # Un lugar extra al final para el código -1 (nulos)
+    numeros = np.array([MESES_ES.get(str(nombre).strip()[:3].capitalize(), 0) for nombre in nombres] + [0])
+    mes = numeros[codigos]
+    año = pd.to_numeric(df[col_año], errors="coerce").to_numpy(dtype=np.float64)
+    valido = (mes > 0) & np.isfinite(año)
+
+    clave = np.where(valido, np.nan_to_num(año) * 12 + mes, 0).astype(np.int32)
+    return pd.DataFrame({
+        "mes_clave": pd.arrays.IntegerArray(clave, ~valido),
+        "fecha_mes": clave_a_fecha(np.where(valido, clave, -1)),
+    }, index=df.index)
+
+
+# Primer día del mes de cada clave (año * 12 + mes); las claves < 0 quedan en NaT
+def clave_a_fecha(clave):
+    clave = np.asarray(clave, dtype=np.int64)
+    fecha = (clave - (1970 * 12 + 1)).astype("datetime64[M]").astype("datetime64[ns]")
+    fecha[clave < 0] = np.datetime64("NaT")
+    return fecha
+
+
+# Texto "AAAA-MM" de cada clave, el mismo que str() de un periodo mensual
+def clave_a_texto(clave):
+    clave = np.asarray(clave, dtype=np.int64)
+    return np.char.add(
+        np.char.add(((clave - 1) // 12).astype(str), "-"),
+        np.char.zfill(((clave - 1) % 12 + 1).astype(str), 2),
+    )
+
+
+# Clave "Unidad": el vehículo sin su identificador, sin espacios y en mayúsculas.
+# Misma regla que el lambda fila por fila, pero evaluada una sola vez por cada par
+# (vehículo, identificador) distinto y repartida a las filas con códigos enteros
+def derivar_unidad(df, col_vehiculo="vehículo", col_id="identificador_vehículo"):
+    codigos_v, vehiculos = pd.factorize(df[col_vehiculo])
+    codigos_i, identificadores = pd.factorize(df[col_id])
+
+    # Los nulos quedan con código -1: se corren a 0 para combinar ambos códigos
+    pares = (codigos_v.astype(np.int64) + 1) * (len(identificadores) + 1) + (codigos_i + 1)
+    inverso, pares_unicos = pd.factorize(pares)
+
+    claves = np.empty(len(pares_unicos), dtype=object)
+    for k, par in enumerate(pares_unicos):
+        cv, ci = divmod(int(par), len(identificadores) + 1)
+        vehiculo = vehiculos[cv - 1] if cv else None
+        identificador = identificadores[ci - 1] if ci else None
+        if isinstance(vehiculo, str) and isinstance(identificador, str):
+            claves[k] = vehiculo.replace(identificador.replace(" ", ""), "").replace(" ", "").upper().strip()
+        else:
+            claves[k] = "SIN_DATO"
+
+    return pd.Series(claves[inverso], index=df.index, name="Unidad")
+
+
+# Filtros de filas en una sola pasada: rendimiento_real en (0, 25), recorrido > 0 y,
+# si se dan las cotas (p. ej. cuantiles 1%/99% del sketch), recorrido en [q_inf, q_sup].
+# Se arma una sola máscara; no se ordena ni se copia el DataFrame entre filtros
+def mascara_un_paso(df, q_inf=None, q_sup=None):
+    rendimiento_real = pd.to_numeric(df["rendimiento_real"], errors="coerce").to_numpy()
+    recorrido = pd.to_numeric(df["recorrido"], errors="coerce").to_numpy()
+    mascara = (rendimiento_real > 0) & (rendimiento_real < 25) & (recorrido > 0)
+    if q_inf is not None:
+        mascara &= recorrido >= q_inf
+    if q_sup is not None:
+        mascara &= recorrido <= q_sup
+    return mascara
+
+
+def filtrar_un_paso(df, q_inf=None, q_sup=None):
+    return df[mascara_un_paso(df, q_inf, q_sup)]
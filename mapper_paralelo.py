@@ -0,0 +1,271 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.base import clone
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
+
+# --- Construcción del grafo Mapper con los cubos en paralelo ---
+# Mismo algoritmo que mapper.map de KeplerMapper (cubos de la cobertura, clustering de
+# la imagen inversa de cada cubo y nervio por intersección), pero:
+#   * el trabajo se reparte en un pool de procesos en lugar de ir cubo por cubo;
+#   * con DBSCAN, la búsqueda de vecinos a distancia <= eps se hace una sola vez por
+#     par de filas: las filas se agrupan en celdas (filas con exactamente los mismos
+#     cubos) y solo se buscan vecinos entre celdas que comparten algún cubo. Cada cubo
+#     recorta su submatriz de ese grafo compartido y la agrupa con componentes conexas,
+#     así que las filas que caen en dos cubos por el traslape no repiten la búsqueda;
+#   * el nervio sale de un producto disperso nodos x filas en lugar de comparar todos
+#     los pares de nodos con sets.
+# El resultado tiene el formato de KeplerMapper (nodes, links, simplices, meta_data,
+# meta_nodes) y los mismos nombres cube{i}_cluster{j}, así que sirve para visualize.
+
+# Estado de cada proceso del pool (se pasa una vez en el initializer, no por tarea)
+_X = None
+_CLUSTERER = None
+
+
+def _iniciar_proceso(X, clusterer):
+    global _X, _CLUSTERER
+    _X, _CLUSTERER = X, clusterer
+
+
+# Mínimo de filas para agrupar un cubo, con la misma regla que KeplerMapper
+def min_filas_cubo(clusterer):
+    parametros = clusterer.get_params()
+    for parametro in ["n_clusters", "min_cluster_size", "min_samples"]:
+        valor = parametros.get(parametro)
+        if valor and isinstance(valor, int):
+            return valor
+    return 2
+
+
+# Con DBSCAN (sobre X, no sobre distancias precalculadas) se comparte la búsqueda de vecinos
+def comparte_vecinos(clusterer):
+    return isinstance(clusterer, DBSCAN) and clusterer.metric != "precomputed"
+
+
+# Celda de cada fila según los cubos que la contienen (-1 si no está en ninguno) y
+# pares de celdas (a <= b) que aparecen juntas en al menos un cubo
+def celdas_cobertura(ids_cubos, n):
+    pertenencia = np.zeros((n, len(ids_cubos)), dtype=bool)
+    for j, ids in enumerate(ids_cubos):
+        pertenencia[ids, j] = True
+    claves, celda = np.unique(np.packbits(pertenencia, axis=1), axis=0, return_inverse=True)
+    celda = celda.ravel()
+    cubos_celda = np.unpackbits(claves, axis=1, count=len(ids_cubos)).astype(np.int32)
+    vacias = ~cubos_celda.any(axis=1)
+    celda[vacias[celda]] = -1
+
+    juntas = sparse.triu(sparse.csr_matrix(cubos_celda) @ sparse.csr_matrix(cubos_celda).T).tocoo()
+    pares = [(a, b) for a, b in zip(juntas.row.tolist(), juntas.col.tolist()) if not vacias[a]]
+    return celda, pares
+
+
+# Vecinos a distancia <= eps entre las filas de la celda b y las de las celdas `otras`
+# (todas <= b), con los mismos parámetros de búsqueda que usaría DBSCAN. El árbol se
+# construye una vez con la celda b y se consulta con todas las demás
+def _vecinos_celda(filas_b, filas_otras, con_distancias=False):
+    vecinos = NearestNeighbors(
+        radius=_CLUSTERER.eps,
+        algorithm=_CLUSTERER.algorithm,
+        leaf_size=_CLUSTERER.leaf_size,
+        metric=_CLUSTERER.metric,
+        metric_params=_CLUSTERER.metric_params,
+        p=_CLUSTERER.p,
+    ).fit(_X[filas_b])
+    if con_distancias:
+        distancias, encontrados = vecinos.radius_neighbors(_X[filas_otras])
+        distancias = np.concatenate(distancias)
+    else:
+        encontrados = vecinos.radius_neighbors(_X[filas_otras], return_distance=False)
+        distancias = None
+    origen = np.repeat(filas_otras, [len(v) for v in encontrados])
+    destino = filas_b[np.concatenate(encontrados).astype(np.int64)]
+    return origen, destino, distancias
+
+
+# Grafo disperso (n x n) de vecinos entre filas que comparten cubo: solo estructura, o
+# con la distancia de cada par si con_distancias=True (para recortarlo a un eps menor)
+def grafo_vecinos(celda, pares, pool=None, con_distancias=False):
+    filas_celda = {c: np.flatnonzero(celda == c) for c in np.unique(celda[celda >= 0]).tolist()}
+    otras_por_celda = defaultdict(list)
+    for a, b in pares:
+        otras_por_celda[b].append(a)
+    tareas = [
+        (filas_celda[b], np.concatenate([filas_celda[a] for a in otras]), con_distancias)
+        for b, otras in otras_por_celda.items()
+    ]
+    if pool is None:
+        resultados = [_vecinos_celda(*tarea) for tarea in tareas]
+    else:
+        resultados = list(pool.map(_vecinos_celda, *zip(*tareas))) if tareas else []
+
+    # Los pares entre celdas distintas se buscaron en un solo sentido
+    origen, destino, distancias = [], [], []
+    for o, d, dist in resultados:
+        cruzados = celda[o] != celda[d]
+        origen += [o, d[cruzados]]
+        destino += [d, o[cruzados]]
+        if con_distancias:
+            distancias += [dist, dist[cruzados]]
+    vacio = [np.empty(0, dtype=np.int64)]
+    origen = np.concatenate(origen or vacio)
+    destino = np.concatenate(destino or vacio)
+
+    # CSR armado directo: los orígenes vienen en tramos ordenados, así que el argsort
+    # estable es casi lineal (y no hay duplicados que sumar)
+    n = len(celda)
+    orden = np.argsort(origen, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(origen, minlength=n))])
+    if con_distancias:
+        datos = np.concatenate(distancias or [np.empty(0)])[orden]
+    else:
+        datos = np.ones(len(orden), dtype=bool)
+    return sparse.csr_matrix((datos, destino[orden], indptr), shape=(n, n))
+
+
+# DBSCAN sobre el grafo de vecinos de un cubo, con las mismas etiquetas que sklearn:
+# los núcleos son las filas con >= min_samples vecinos (ellas incluidas), cada
+# componente conexa de núcleos es un cluster numerado según su primer núcleo, y un
+# punto frontera toma el cluster de menor número entre los de sus núcleos vecinos
+# (sklearn expande los clusters en ese orden y el primero que lo alcanza se lo queda)
+def dbscan_en_grafo(vecinos, min_samples):
+    n = vecinos.shape[0]
+    etiquetas = np.full(n, -1, dtype=np.int64)
+    es_nucleo = np.diff(vecinos.indptr) >= min_samples
+    nucleos = np.flatnonzero(es_nucleo)
+    if len(nucleos) == 0:
+        return etiquetas
+
+    # Con datos float64 connected_components no reordena los índices de cada fila
+    entre_nucleos = vecinos[nucleos][:, nucleos]
+    entre_nucleos = sparse.csr_matrix(
+        (np.ones(entre_nucleos.nnz), entre_nucleos.indices, entre_nucleos.indptr), shape=entre_nucleos.shape
+    )
+    n_componentes, componente = connected_components(entre_nucleos, directed=False)
+    primero = np.full(n_componentes, n, dtype=np.int64)
+    np.minimum.at(primero, componente, nucleos)
+    numero = np.empty(n_componentes, dtype=np.int64)
+    numero[np.argsort(primero)] = np.arange(n_componentes)
+    etiquetas[nucleos] = numero[componente]
+
+    frontera = np.flatnonzero(~es_nucleo)
+    hacia_nucleos = vecinos[frontera][:, nucleos]
+    con_nucleo = np.diff(hacia_nucleos.indptr) > 0
+    if con_nucleo.any():
+        candidatas = numero[componente[hacia_nucleos.indices]]
+        etiquetas[frontera[con_nucleo]] = np.minimum.reduceat(
+            candidatas, hacia_nucleos.indptr[:-1][con_nucleo]
+        )
+    return etiquetas
+
+
+# Etiquetas de un cubo: con la submatriz de vecinos del cubo si se compartió la
+# búsqueda, o con el clusterer sobre las filas `ids` en cualquier otro caso
+def _agrupar_cubo(ids, submatriz=None):
+    if submatriz is not None:
+        return dbscan_en_grafo(submatriz, _CLUSTERER.min_samples)
+    return clone(_CLUSTERER).fit_predict(_X[ids])
+
+
+def _agrupar_cubos(ids_cubos, X, clusterer, pool=None):
+    if comparte_vecinos(clusterer):
+        celda, pares = celdas_cobertura(ids_cubos, len(X))
+        vecinos = grafo_vecinos(celda, pares, pool)
+        submatrices = [vecinos[ids][:, ids] for ids in ids_cubos]
+    else:
+        submatrices = [None] * len(ids_cubos)
+    if pool is None:
+        return list(map(_agrupar_cubo, ids_cubos, submatrices))
+    return list(pool.map(_agrupar_cubo, ids_cubos, submatrices))
+
+
+# Aristas entre nodos que comparten al menos min_intersection filas. Las aristas se
+# listan como en GraphNerve: links[a] tiene los nodos b posteriores a `a`, en orden
+def calcular_nervio(nodes, min_intersection=1):
+    nombres = list(nodes)
+    tamaños = [len(nodes[nombre]) for nombre in nombres]
+    filas = np.concatenate([np.asarray(nodes[nombre], dtype=np.int64) for nombre in nombres] or [[]])
+    pertenencia = sparse.csr_matrix(
+        (np.ones(len(filas), dtype=np.int32), (np.repeat(np.arange(len(nombres)), tamaños), filas)),
+        shape=(len(nombres), int(filas.max()) + 1 if len(filas) else 0),
+    )
+    compartidas = sparse.triu(pertenencia @ pertenencia.T, k=1).tocoo()
+    pares = compartidas.data >= min_intersection
+    origen, destino = compartidas.row[pares], compartidas.col[pares]
+    orden = np.lexsort((destino, origen))
+
+    links = defaultdict(list)
+    for i, j in zip(origen[orden].tolist(), destino[orden].tolist()):
+        links[nombres[i]].append(nombres[j])
+    simplices = [[nombre] for nombre in nombres] + [[a, b] for a in links for b in links[a]]
+    return links, simplices
+
+
+# Cubos de la cobertura como [(i, filas)], con la numeración de KeplerMapper (solo
+# cubos no vacíos) y sin los que tienen menos de `minimo` filas
+def cubos_cobertura(lens, cover, minimo=1):
+    lens = np.asarray(lens)
+    if lens.ndim == 1:
+        lens = lens.reshape(-1, 1)
+    # La cobertura espera la columna de ids al frente, como en KeplerMapper
+    lens_ids = np.c_[np.arange(len(lens)), lens]
+    cover.fit(lens_ids)
+    return [
+        (i, cubo[:, 0].astype(int)) for i, cubo in enumerate(cover.transform(lens_ids))
+        if cubo.shape[0] >= minimo
+    ]
+
+
+# Nodos cube{i}_cluster{j} a partir de las etiquetas de cada cubo
+def nodos_de_etiquetas(cubos, etiquetas):
+    nodes = defaultdict(list)
+    for (i, ids), predicciones in zip(cubos, etiquetas):
+        for pred in np.unique(predicciones):
+            # -1 es ruido
+            if pred != -1 and not np.isnan(pred):
+                nodes[f"cube{i}_cluster{int(pred)}"] = ids[predicciones == pred].tolist()
+    return nodes
+
+
+# Equivalente a mapper.map(lens, X, cover=cover, clusterer=clusterer). `cover` es un
+# km.Cover (o cualquier objeto con su fit/transform); n_procesos=1 agrupa los cubos
+# en el proceso actual
+def construir_grafo(lens, X, cover, clusterer, min_intersection=1, n_procesos=None):
+    X = np.asarray(X)
+    cubos = cubos_cobertura(lens, cover, min_filas_cubo(clusterer))
+
+    ids_cubos = [ids for _, ids in cubos]
+    n_procesos = n_procesos or os.cpu_count() or 1
+    if n_procesos == 1 or len(cubos) <= 1:
+        _iniciar_proceso(X, clusterer)
+        try:
+            etiquetas = _agrupar_cubos(ids_cubos, X, clusterer)
+        finally:
+            _iniciar_proceso(None, None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_procesos, initializer=_iniciar_proceso, initargs=(X, clusterer)
+        ) as pool:
+            etiquetas = _agrupar_cubos(ids_cubos, X, clusterer, pool)
+
+    nodes = nodos_de_etiquetas(cubos, etiquetas)
+    links, simplices = calcular_nervio(nodes, min_intersection)
+    return {
+        "nodes": nodes,
+        "links": links,
+        "simplices": simplices,
+        "meta_data": {
+            "projection": "custom",
+            "n_cubes": cover.n_cubes,
+            "perc_overlap": cover.perc_overlap,
+            "clusterer": str(clusterer),
+            "scaler": "None",
+            "nerve_min_intersection": min_intersection,
+        },
+        "meta_nodes": defaultdict(list),
+    }
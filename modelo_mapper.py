@@ -0,0 +1,164 @@
+import re
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import normalize
+
+from lente import MEMORIA_BLOQUE_MB, lente_con_escala, suma_densidad
+from mapper_paralelo import comparte_vecinos
+
+# --- Modelo Mapper ajustado: asignar transacciones nuevas a los nodos existentes ---
+# Guarda lo necesario para repetir el camino de una fila sin reconstruir el grafo:
+#   * el escalador y las columnas de df_mapper;
+#   * la lente: las filas de entrenamiento normalizadas, la suma total de densidades y
+#     el MinMaxScaler de entrenamiento. Una fila nueva se suma solo contra las filas de
+#     entrenamiento (la suma de una fila de entrenamiento ya la incluye a ella misma),
+#     así que una fila ya vista recupera exactamente su lente y una cercana, una parecida;
+#   * los intervalos de la cobertura (centro ± radio) de los cubos con nodos, con la
+#     numeración cube{i} de KeplerMapper;
+#   * representantes por cubo: con DBSCAN, los núcleos de cada nodo (una fila nueva cae
+#     en el nodo del núcleo más cercano a distancia <= eps, como un punto frontera); con
+#     otros clusterers, todas las filas del nodo y el vecino más cercano sin radio.
+# Todo se hace por lotes: una suma de densidades por bloques, una comparación contra los
+# intervalos y una búsqueda de vecino más cercano por cubo.
+RUTA_MODELO = "modelo_mapper.pkl"
+
+NOMBRE_NODO = re.compile(r"cube(\d+)_cluster(\d+)")
+
+
+# Filas (m x cubos) cuya lente cae dentro de cada cubo, con los mismos bordes cerrados
+# que Cover.transform_single
+def pertenencia_cubos(lens, centros, radio):
+    lens = np.asarray(lens, dtype=float).reshape(len(lens), -1)
+    inferior, superior = centros - radio, centros + radio
+    return ((lens[:, None, :] >= inferior[None]) & (lens[:, None, :] <= superior[None])).all(axis=2)
+
+
+class ModeloMapper:
+    def __init__(self, columnas, scaler, X_unit, epsilon, grado, total, escala_lente, centros, radio, cubos):
+        self.columnas = list(columnas)
+        self.scaler = scaler
+        self.X_unit = X_unit
+        self.epsilon = epsilon
+        self.grado = grado
+        self.total = total
+        self.escala_lente = escala_lente
+        self.centros = centros
+        self.radio = radio
+        # [(centro, i, vecinos, nodo de cada representante, radio de asignación)]
+        self.cubos = cubos
+
+    # A partir de lo que ya se usó en el notebook: df_mapper y el escalador ajustado, el
+    # epsilon (y grado) de la lente, la cobertura ya ajustada por construir_grafo o
+    # mapper.map, el clusterer y el grafo resultante (posiciones dentro de df_mapper).
+    # lente_entrenamiento es (lens, total, MinMaxScaler), p. ej. de lente_cacheada
+    @classmethod
+    def ajustar(cls, df_mapper, columnas, scaler, epsilon, cover, clusterer, graph, grado=None,
+                lente_entrenamiento=None, memoria_mb=MEMORIA_BLOQUE_MB, n_hilos=1):
+        X = scaler.transform(df_mapper[list(columnas)])
+        X_unit = normalize(np.asarray(X, dtype=np.float64))
+
+        # Lente de entrenamiento con su suma total y su MinMaxScaler: la que ya se calculó
+        # (lente_cacheada(..., con_escala=True)) o, si no se da, se calcula aquí (O(n²) exacta)
+        if lente_entrenamiento is None:
+            lente_entrenamiento = lente_con_escala(X, epsilon, memoria_mb, grado, n_hilos)
+        lens, total, escala_lente = lente_entrenamiento
+        if len(lens) != len(X):
+            raise ValueError(f"La lente tiene {len(lens)} filas y df_mapper {len(X)}.")
+
+        # KeplerMapper numera solo los cubos no vacíos
+        centros = np.asarray(cover.centers_, dtype=float).reshape(len(cover.centers_), -1)
+        radio = np.asarray(cover.radius_, dtype=float)
+        dentro = pertenencia_cubos(lens, centros, radio)
+        no_vacios = np.flatnonzero(dentro.any(axis=0))
+
+        nodos_cubo = {}
+        for nombre in graph["nodes"]:
+            i = int(NOMBRE_NODO.fullmatch(nombre).group(1))
+            nodos_cubo.setdefault(i, []).append(nombre)
+
+        cubos = []
+        for i in sorted(nodos_cubo):
+            ids_cubo = np.flatnonzero(dentro[:, no_vacios[i]])
+            nodo_de_fila = np.full(len(X), -1, dtype=np.int64)
+            for k, nombre in enumerate(nodos_cubo[i]):
+                nodo_de_fila[np.asarray(graph["nodes"][nombre], dtype=np.int64)] = k
+
+            if comparte_vecinos(clusterer):
+                vecinos = NearestNeighbors(
+                    radius=clusterer.eps,
+                    algorithm=clusterer.algorithm,
+                    leaf_size=clusterer.leaf_size,
+                    metric=clusterer.metric,
+                    metric_params=clusterer.metric_params,
+                    p=clusterer.p,
+                ).fit(X[ids_cubo])
+                conteos = np.array([len(v) for v in vecinos.radius_neighbors(X[ids_cubo], return_distance=False)])
+                representantes = ids_cubo[conteos >= clusterer.min_samples]
+                alcance = clusterer.eps
+            else:
+                vecinos = NearestNeighbors()
+                representantes = ids_cubo
+                alcance = np.inf
+            representantes = representantes[nodo_de_fila[representantes] >= 0]
+            if len(representantes) == 0:
+                continue
+
+            vecinos.set_params(n_neighbors=1).fit(X[representantes])
+            nombres = np.array(nodos_cubo[i], dtype=object)[nodo_de_fila[representantes]]
+            cubos.append((no_vacios[i], i, vecinos, nombres, alcance))
+
+        return cls(columnas, scaler, X_unit, epsilon, grado, total, escala_lente, centros, radio, cubos)
+
+    # Lente de filas nuevas (ya escaladas y normalizadas) en la escala de entrenamiento
+    def lente(self, Q_unit, memoria_mb=MEMORIA_BLOQUE_MB, n_hilos=1):
+        f_eps = suma_densidad(Q_unit, self.X_unit, self.epsilon, memoria_mb, self.grado, n_hilos)
+        f_eps /= self.total
+        return self.escala_lente.transform(f_eps.reshape(-1, 1))
+
+    # Tabla larga (fila, nodo) con los nodos a los que cae cada fila de `df`; `fila` es
+    # el índice de df. Una fila puede caer en varios nodos (cubos traslapados) o en
+    # ninguno; las filas con alguna columna vacía no se asignan
+    def asignar(self, df, memoria_mb=MEMORIA_BLOQUE_MB, n_hilos=1):
+        datos = df[self.columnas]
+        datos = datos[datos.notna().all(axis=1)]
+        vacio = pd.DataFrame({"fila": df.index[:0], "nodo": pd.Series([], dtype=object)})
+        if len(datos) == 0:
+            return vacio
+
+        X = np.asarray(self.scaler.transform(datos), dtype=np.float64)
+        lens = self.lente(normalize(X), memoria_mb, n_hilos)
+        dentro = pertenencia_cubos(lens, self.centros[[c[0] for c in self.cubos]], self.radio)
+
+        filas, nodos = [], []
+        for k, (_, _, vecinos, nombres, alcance) in enumerate(self.cubos):
+            en_cubo = np.flatnonzero(dentro[:, k])
+            if len(en_cubo) == 0:
+                continue
+            distancias, cercano = vecinos.kneighbors(X[en_cubo])
+            cerca = distancias[:, 0] <= alcance
+            filas.append(en_cubo[cerca])
+            nodos.append(nombres[cercano[cerca, 0]])
+        if not filas:
+            return vacio
+
+        filas = np.concatenate(filas)
+        nodos = np.concatenate(nodos)
+        orden = np.argsort(filas, kind="stable")
+        return pd.DataFrame({"fila": datos.index[filas[orden]], "nodo": nodos[orden]})
+
+    # True para las filas de `df` que caen en alguno de `nodos` (p. ej. los de
+    # nodos_bajos), indexado como df
+    def en_nodos(self, df, nodos, **kwargs):
+        asignacion = self.asignar(df, **kwargs)
+        marcadas = asignacion.loc[asignacion["nodo"].isin(list(nodos)), "fila"]
+        return pd.Series(df.index.isin(marcadas), index=df.index)
+
+    def guardar(self, ruta=RUTA_MODELO):
+        joblib.dump(self, ruta)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_MODELO):
+        return joblib.load(ruta)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from indice_nodos import estadisticas_nodos
+
+# --- Detección automática de nodos de bajo rendimiento ---
+# Cada nodo del Mapper se puntúa con la eficiencia media de sus filas
+# (rendimiento_real / rendimiento, la misma eficiencia_relativa del modelo) y se ubica
+# en la distribución global de eficiencia por fila: percentil_global es la fracción de
+# filas con eficiencia menor o igual a la media del nodo. Los nodos con percentil
+# <= UMBRAL_PERCENTIL se marcan y la unión de sus filas es df_malos_contexto.
+UMBRAL_PERCENTIL = 0.10
+RUTA_MALOS_CONTEXTO = "df_malos_contexto.csv"
+
+# Columnas del CSV que lee el dashboard
+COLUMNAS_CONTEXTO = [
+    "conductor", "vehículo", "Unidad", "no_estación_pemex", "rendimiento", "rendimiento_real",
+    "precio_unitario", "cantidad_mercancía", "kg_c02", "division", "bl", "mercancía",
+]
+
+
+def eficiencia_relativa(df):
+    eficiencia = pd.to_numeric(df["rendimiento_real"], errors="coerce") / pd.to_numeric(df["rendimiento"], errors="coerce")
+    return eficiencia.replace([np.inf, -np.inf], np.nan)
+
+
+# Tabla por nodo: tamaño, filas con eficiencia válida, eficiencia media, percentil y
+# puntaje z frente a todas las filas de `df` (indexada como df_filtrado)
+def puntuar_nodos(indice, df):
+    eficiencia = eficiencia_relativa(df)
+    valida = eficiencia.notna()
+    # Las filas sin eficiencia (rendimiento nulo o cero) no cuentan en la media del nodo
+    tabla = estadisticas_nodos(
+        indice,
+        pd.DataFrame({"eficiencia": eficiencia.fillna(0.0), "valida": valida.astype(float)}, index=df.index),
+        ["eficiencia", "valida"],
+        ["sum"],
+    )
+    tabla = pd.DataFrame({
+        "tamaño": tabla["tamaño"],
+        "filas_validas": tabla["valida_sum"].astype(np.int64),
+        "eficiencia_media": tabla["eficiencia_sum"] / tabla["valida_sum"].replace(0, np.nan),
+    })
+
+    ordenada = np.sort(eficiencia[valida].to_numpy())
+    tabla["percentil_global"] = np.searchsorted(ordenada, tabla["eficiencia_media"].to_numpy(), side="right") / max(len(ordenada), 1)
+    tabla.loc[tabla["eficiencia_media"].isna(), "percentil_global"] = np.nan
+    tabla["z_global"] = (tabla["eficiencia_media"] - ordenada.mean()) / ordenada.std()
+    return tabla.sort_values("percentil_global")
+
+
+def nodos_bajos(tabla, umbral=UMBRAL_PERCENTIL):
+    return tabla.index[tabla["percentil_global"] <= umbral].tolist()
+
+
+# df_malos_contexto a partir del grafo: puntúa todos los nodos, marca los de bajo
+# rendimiento y toma la unión de sus filas de una vez (sin filas repetidas). Si `ruta`
+# no es None también escribe el CSV que usa el dashboard. Regresa df_malos_contexto y
+# la tabla de puntajes
+def detectar_malos_contexto(indice, df_filtrado, umbral=UMBRAL_PERCENTIL, ruta=RUTA_MALOS_CONTEXTO):
+    tabla = puntuar_nodos(indice, df_filtrado)
+    tabla["bajo"] = tabla.index.isin(nodos_bajos(tabla, umbral))
+    df_malos_contexto = df_filtrado.loc[indice.filas_de(tabla.index[tabla["bajo"]])].copy()
+    if ruta is not None:
+        columnas = [col for col in COLUMNAS_CONTEXTO if col in df_malos_contexto.columns]
+        df_malos_contexto[columnas].to_csv(ruta, index=False, encoding="utf-8-sig")
+    return df_malos_contexto, tabla
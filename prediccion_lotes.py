@@ -0,0 +1,85 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from esquema import leer_csv
+from rasgos_modelo import CAT_COLS, DIR_RASGOS, POR_OMISION, RasgosModelo
+
+# --- Predicción por lotes con el clasificador de eficiencia ---
+# Un plan de viajes (conductor, vehículo, division, bl, mercancía, no_estación_pemex) se
+# evalúa completo: los rasgos del conductor y del vehículo se unen de una vez con las
+# tablas de rasgos_modelo (get_indexer, sin recorrer el historial) y el pipeline se
+# aplica por bloques de filas, con una sola llamada a predict_proba por bloque (pred es
+# la clase de mayor probabilidad, lo mismo que regresa predict).
+RUTA_MODELO_RENDIMIENTO = "modelo_rendimiento.pkl"
+TAMAÑO_BLOQUE = 50_000
+COLUMNAS_VIAJE = ["conductor", "vehículo"] + CAT_COLS
+
+
+def leer_viajes(ruta):
+    if ruta.lower().endswith(".parquet"):
+        return pd.read_parquet(ruta)
+    return leer_csv(ruta)
+
+
+def escribir_viajes(df, ruta):
+    if ruta.lower().endswith(".parquet"):
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False, encoding="utf-8-sig")
+
+
+# Columna de predict_proba de la clase eficiente: 1, True o "1", según con qué etiquetas
+# se entrenó el clasificador
+def columna_positiva(clases):
+    for k, clase in enumerate(clases):
+        if str(clase) in ("1", "1.0", "True"):
+            return k
+    raise ValueError(f"El modelo no tiene la clase eficiente (1); sus clases son {list(clases)}")
+
+
+# Copia de `viajes` con pred y predict_proba (probabilidad de la clase 1, eficiente).
+# Conductores o vehículos sin historial toman `omision`, como en el dashboard
+def predecir_viajes(viajes, modelo, rasgos, tamaño_bloque=TAMAÑO_BLOQUE, omision=POR_OMISION):
+    faltantes = [col for col in COLUMNAS_VIAJE if col not in viajes.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en los viajes: {faltantes}")
+
+    X = rasgos.entrada_modelo(viajes, omision)
+    clases = np.asarray(modelo.classes_)
+    positiva = columna_positiva(clases)
+    pred = np.empty(len(X), dtype=clases.dtype)
+    proba = np.empty(len(X))
+    for inicio in range(0, len(X), tamaño_bloque):
+        bloque = slice(inicio, inicio + tamaño_bloque)
+        probabilidades = modelo.predict_proba(X.iloc[bloque])
+        pred[bloque] = clases[probabilidades.argmax(axis=1)]
+        proba[bloque] = probabilidades[:, positiva]
+
+    resultado = viajes.copy()
+    resultado["pred"] = pred
+    resultado["predict_proba"] = proba
+    return resultado
+
+
+def predecir_archivo(entrada, salida, ruta_modelo=RUTA_MODELO_RENDIMIENTO, dir_rasgos=DIR_RASGOS,
+                     tamaño_bloque=TAMAÑO_BLOQUE):
+    modelo = joblib.load(ruta_modelo)
+    rasgos = RasgosModelo.cargar(dir_rasgos)
+    resultado = predecir_viajes(leer_viajes(entrada), modelo, rasgos, tamaño_bloque)
+    escribir_viajes(resultado, salida)
+    return resultado
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python prediccion_lotes.py plan_viajes.csv plan_predicho.parquet
+    if len(sys.argv) != 3:
+        sys.exit("Uso: python prediccion_lotes.py <viajes.csv|.parquet> <salida.csv|.parquet>")
+    if not os.path.exists(sys.argv[1]):
+        sys.exit(f"No existe {sys.argv[1]}")
+    resultado = predecir_archivo(sys.argv[1], sys.argv[2])
+    print(f"Viajes evaluados: {len(resultado)} ({int((resultado['pred'] == 1).sum())} eficientes)")
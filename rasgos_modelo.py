@@ -0,0 +1,121 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- Rasgos del clasificador de eficiencia por conductor y por vehículo ---
+# conductor_score, vehiculo_score, rend_cond_mean y rend_veh_mean son constantes por
+# conductor o por vehículo: en lugar de repetirlos en cada fila de df_modelo (transform)
+# y volver a promediarlos con una máscara sobre todo el historial en cada predicción, se
+# guardan al entrenar dos tablas pequeñas (una fila por conductor y una por vehículo) en
+# Parquet. Al cargarlas quedan indexadas por la clave como texto, así que los rasgos de un
+# viaje son una búsqueda en el índice (hash) y los de muchos viajes, un get_indexer.
+DIR_RASGOS = "rasgos_modelo"
+
+# Rasgo: (clave, columna de df_modelo que se promedia)
+RASGOS = {
+    "conductor_score": ("conductor", "eficiencia_ok"),
+    "vehiculo_score": ("vehículo", "eficiencia_ok"),
+    "rend_cond_mean": ("conductor", "rendimiento_real"),
+    "rend_veh_mean": ("vehículo", "rendimiento_real"),
+}
+NUM_COLS = list(RASGOS)
+CAT_COLS = ["division", "bl", "mercancía", "no_estación_pemex"]
+
+# Valores para un conductor o vehículo sin historial (los que ya usaba el dashboard)
+POR_OMISION = {"conductor_score": 0.5, "vehiculo_score": 0.5, "rend_cond_mean": 10.0, "rend_veh_mean": 10.0}
+
+
+# Un id numérico escrito como flotante ("123.0", p. ej. al pasar por un CSV)
+ENTERO_CON_DECIMALES = re.compile(r"^(-?\d+)\.0+$")
+
+
+# Clave como texto (igual que en los selectbox del dashboard). Los enteros se escriben
+# sin decimales: 123, 123.0 (columna float por un NaN) y "123.0" son la misma clave
+def _clave(valor):
+    if isinstance(valor, (float, np.floating)) and np.isfinite(valor) and float(valor).is_integer():
+        valor = int(valor)
+    return ENTERO_CON_DECIMALES.sub(r"\1", str(valor))
+
+
+# Claves de una columna, con los nulos como nulos
+def _claves(valores):
+    valores = pd.Series(np.asarray(valores, dtype=object))
+    return valores.map(_clave, na_action="ignore").astype("string")
+
+
+class RasgosModelo:
+    def __init__(self, tablas):
+        # {clave: DataFrame indexado por la clave con sus rasgos}
+        self.tablas = tablas
+
+    # A partir de df_modelo: promedio de eficiencia_ok y rendimiento_real por conductor y
+    # por vehículo. Si df_modelo ya trae los rasgos repetidos por fila (df_modelo.csv) y
+    # no la columna original, se promedia el rasgo mismo, que es constante en el grupo
+    @classmethod
+    def construir(cls, df_modelo):
+        tablas = {}
+        for rasgo, (clave, columna) in RASGOS.items():
+            origen = columna if columna in df_modelo.columns else rasgo
+            valores = pd.to_numeric(df_modelo[origen], errors="coerce").astype(np.float64)
+            media = valores.groupby(_claves(df_modelo[clave]).to_numpy(), dropna=True).mean()
+            tablas.setdefault(clave, []).append(media.rename(rasgo))
+        tablas = {clave: pd.concat(medias, axis=1) for clave, medias in tablas.items()}
+        for clave, tabla in tablas.items():
+            tabla.index = pd.Index(tabla.index, dtype=object, name=clave)
+        return cls(tablas)
+
+    def conoce(self, clave, valor):
+        return _clave(valor) in self.tablas[clave].index
+
+    # Rasgos de cada fila de `df` (que trae las columnas conductor y vehículo), indexados
+    # como df. Las claves sin historial toman `omision` (None las deja en NaN)
+    def unir(self, df, omision=POR_OMISION):
+        rasgos = pd.DataFrame(index=df.index)
+        for rasgo, (clave, _) in RASGOS.items():
+            tabla = self.tablas[clave]
+            posiciones = tabla.index.get_indexer(_claves(df[clave]).fillna("").to_numpy(dtype=object))
+            valores = tabla[rasgo].to_numpy()[posiciones]
+            valores[posiciones < 0] = np.nan
+            rasgos[rasgo] = valores
+        if omision is not None:
+            rasgos = rasgos.fillna(omision)
+        return rasgos
+
+    # Rasgos de un solo viaje como dict, con una búsqueda por tabla
+    def rasgos(self, conductor, vehiculo, omision=POR_OMISION):
+        viaje = {"conductor": _clave(conductor), "vehículo": _clave(vehiculo)}
+        resultado = {}
+        for rasgo, (clave, _) in RASGOS.items():
+            tabla = self.tablas[clave]
+            if viaje[clave] in tabla.index:
+                resultado[rasgo] = float(tabla.at[viaje[clave], rasgo])
+            else:
+                resultado[rasgo] = np.nan if omision is None else omision[rasgo]
+        return resultado
+
+    # Entrada del pipeline (NUM_COLS + CAT_COLS) para los viajes de `df`, con las
+    # categóricas como texto igual que al entrenar
+    def entrada_modelo(self, df, omision=POR_OMISION):
+        X = self.unir(df, omision)
+        for col in CAT_COLS:
+            X[col] = df[col].astype(str).to_numpy()
+        return X[NUM_COLS + CAT_COLS]
+
+    def guardar(self, dir_rasgos=DIR_RASGOS):
+        os.makedirs(dir_rasgos, exist_ok=True)
+        for clave, tabla in self.tablas.items():
+            ruta = os.path.join(dir_rasgos, f"{clave}.parquet")
+            pq.write_table(pa.Table.from_pandas(tabla.reset_index(), preserve_index=False), ruta)
+
+    @classmethod
+    def cargar(cls, dir_rasgos=DIR_RASGOS):
+        tablas = {}
+        for clave in dict.fromkeys(clave for clave, _ in RASGOS.values()):
+            tabla = pq.read_table(os.path.join(dir_rasgos, f"{clave}.parquet")).to_pandas()
+            tabla[clave] = _claves(tabla[clave]).to_numpy(dtype=object)
+            tablas[clave] = tabla.set_index(clave)
+        return cls(tablas)
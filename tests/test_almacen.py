@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from almacen import hash_filas
+
+
+def test_hash_no_depende_del_tipo_inferido():
+    fila = {"km": 123, "litros": 40.5, "vehículo": "ABC 123", "no_estación_pemex": 9361}
+    sin_nulos = pd.DataFrame([fila, {**fila, "km": 200}])
+    con_nulos = pd.DataFrame([fila, {**fila, "km": np.nan, "no_estación_pemex": "SN"}])
+    assert sin_nulos["km"].dtype == np.int64 and con_nulos["km"].dtype == np.float64
+    assert hash_filas(sin_nulos)[0] == hash_filas(con_nulos)[0]
+    # La misma fila con la columna como Int64 u object
+    assert hash_filas(sin_nulos.astype({"km": "Int64"}))[0] == hash_filas(sin_nulos)[0]
+    assert hash_filas(sin_nulos.astype(object))[0] == hash_filas(sin_nulos)[0]
+    # Una celda nula cuenta como la columna ausente, y valores distintos dan huellas distintas
+    assert hash_filas(con_nulos.iloc[[1]])[0] == hash_filas(con_nulos.iloc[[1]].drop(columns="km"))[0]
+    assert hash_filas(sin_nulos)[0] != hash_filas(sin_nulos)[1]
+    assert hash_filas(pd.DataFrame({"km": [123.5]}))[0] != hash_filas(pd.DataFrame({"km": [123]}))[0]
+
+
+def _libro(n=300, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "Fecha Transaccion": [f"{d:02d}/{m:02d}/2024" for d, m in zip(rng.integers(1, 28, n), rng.integers(1, 13, n))],
+        "Concepto": rng.choice(["Consumo", "Consumo", "Bonificacion"], n),
+        "Vehículo": rng.choice([f"Unidad 1FTFW{i:02d}XYZ" for i in range(20)], n),
+        "Identificador  Vehículo": rng.choice([f"1FTFW{i:02d}" for i in range(20)], n),
+        "Conductor": rng.choice([f"COND {i}" for i in range(30)], n),
+        "Division": rng.choice(["RPF", "RPS", "WL"], n),
+        "No Estación Pemex": rng.choice([9361, 1, "ABC", 77], n),
+        "Recorrido": rng.integers(1, 900, n),
+        "Cantidad Mercancía": rng.integers(10, 120, n),
+        "Rendimiento Real": rng.normal(11, 5, n).round(2),
+        "Month": rng.choice(["Ene", "Feb", "Mar"], n),
+    })
+
+
+def test_agregar_mismo_libro_con_fila_nula(tmp_path):
+    import almacen
+
+    libro = _libro()
+    libro.to_excel(tmp_path / "mes.xlsx", index=False)
+    # El mismo export otra vez con una fila más que trae un hueco: en ese bloque
+    # Recorrido y Cantidad Mercancía se leen como float
+    extra = libro.iloc[[0]].assign(**{"Conductor": "COND NUEVO", "Cantidad Mercancía": np.nan})
+    pd.concat([libro, extra]).to_excel(tmp_path / "mes_con_hueco.xlsx", index=False)
+
+    dir_almacen = str(tmp_path / "almacen")
+    nuevas = almacen.agregar_libro(str(tmp_path / "mes.xlsx"), 2024, dir_almacen, filas_por_bloque=1000)
+    assert nuevas > 0
+    assert almacen.agregar_libro(str(tmp_path / "mes_con_hueco.xlsx"), 2024, dir_almacen, filas_por_bloque=1000) == 1
+    # Y en bloques de otro tamaño tampoco entra nada repetido
+    assert almacen.agregar_libro(str(tmp_path / "mes_con_hueco.xlsx"), 2024, dir_almacen, filas_por_bloque=37) == 0
+    assert almacen.leer_estado(dir_almacen)["n_filas"] == nuevas + 1
+
+
+def test_lote_interrumpido_no_cuenta_en_el_sketch(tmp_path, monkeypatch):
+    import almacen
+    from cuantiles import SketchCuantiles
+    from limpieza import limpiar_edenred
+
+    primero = limpiar_edenred(_libro(semilla=1), 2024)
+    segundo = limpiar_edenred(_libro(semilla=2), 2024)
+
+    limpio = str(tmp_path / "limpio")
+    almacen.agregar(primero, limpio)
+    almacen.agregar(segundo, limpio)
+
+    # El proceso se cae justo antes de guardar el estado del segundo lote
+    interrumpido = str(tmp_path / "interrumpido")
+    almacen.agregar(primero, interrumpido)
+    guardar_estado = almacen.guardar_estado
+
+    def falla(estado, dir_almacen):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(almacen, "guardar_estado", falla)
+    try:
+        almacen.agregar(segundo, interrumpido)
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.setattr(almacen, "guardar_estado", guardar_estado)
+    almacen.agregar(segundo, interrumpido)
+
+    esperado, obtenido = almacen.leer_estado(limpio), almacen.leer_estado(interrumpido)
+    assert obtenido == esperado
+    sketch = SketchCuantiles.cargar(str(tmp_path / "interrumpido" / obtenido["sketch"]))
+    assert sketch.n == SketchCuantiles.cargar(str(tmp_path / "limpio" / esperado["sketch"])).n
+    pd.testing.assert_frame_equal(almacen.leer_filtrado(interrumpido), almacen.leer_filtrado(limpio))
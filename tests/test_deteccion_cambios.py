@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from deteccion_cambios import DetectorCambios
+
+
+@pytest.mark.parametrize("calentamiento, paso, observaciones_base", [(30, 1, 30), (30, 50, 500), (100, 5, 100), (7, 2, 20)])
+def test_primera_alarma_despues_del_calentamiento(calentamiento, paso, observaciones_base):
+    rng = np.random.default_rng(0)
+    detector = DetectorCambios(calentamiento=calentamiento, paso=paso)
+    assert detector.observaciones_base == observaciones_base
+    # Un salto enorme justo al terminar la línea base se detecta al cerrar el primer bloque
+    serie = np.r_[rng.normal(1, 0.1, observaciones_base), np.full(3 * paso, 100.0)]
+    eventos = detector.procesar(serie)
+    assert eventos[0]["posicion"] == observaciones_base + paso - 1
+
+    # Y ningún salto dentro del calentamiento dispara una alarma antes de ese punto
+    for salto in (1, observaciones_base // 2, observaciones_base - 1):
+        serie = np.r_[rng.normal(1, 0.1, salto), rng.normal(50, 0.1, 2 * observaciones_base)]
+        eventos = DetectorCambios(calentamiento=calentamiento, paso=paso).procesar(serie)
+        assert all(evento["posicion"] >= observaciones_base + paso - 1 for evento in eventos)
@@ -0,0 +1,105 @@
+import itertools
+
+import kmapper as km
+import numpy as np
+from scipy.sparse.csgraph import minimum_spanning_tree
+from scipy.spatial.distance import cdist, pdist, squareform
+from sklearn.cluster import DBSCAN
+from sklearn.preprocessing import StandardScaler
+
+import bench_unidad
+from cuantiles import SketchCuantiles
+from distancias_diagramas import distancias
+from homologia import diagrama, muertes_h0
+from lente import density_filter_cosine
+from mapper_paralelo import construir_grafo
+from ventanas import persistencia_ventanas
+
+
+def test_derivar_unidad_igual_al_lambda():
+    bench_unidad.test_equivalencia_lambda()
+
+
+# Cúmulos con filas repetidas, como las cargas de combustible redondeadas
+def _datos_mapper(n=3000, semilla=0):
+    rng = np.random.default_rng(semilla)
+    X = np.r_[rng.normal(size=(n, 5)), rng.normal(3, 0.3, size=(n // 4, 5))]
+    X = np.round(np.r_[X, X[:200]], 2)
+    X = StandardScaler().fit_transform(X)
+    return density_filter_cosine(X, 1, grado=4), X
+
+
+def test_construir_grafo_igual_a_kmapper():
+    lens, X = _datos_mapper()
+    esperado = km.KeplerMapper(verbose=0).map(
+        lens, X, cover=km.Cover(n_cubes=10, perc_overlap=0.5), clusterer=DBSCAN(eps=0.5, min_samples=5)
+    )
+    for n_procesos in (1, 2):
+        obtenido = construir_grafo(
+            lens, X, km.Cover(n_cubes=10, perc_overlap=0.5), DBSCAN(eps=0.5, min_samples=5), n_procesos=n_procesos
+        )
+        assert list(obtenido["nodes"]) == list(esperado["nodes"])
+        assert obtenido["nodes"] == esperado["nodes"]
+        assert obtenido["links"] == esperado["links"]
+
+
+def test_muertes_h0_igual_al_mst():
+    rng = np.random.default_rng(0)
+    for n in (2, 7, 300):
+        X = rng.normal(size=(n, 3))
+        if n > 5:
+            X[3] = X[4] = X[1]
+        muertes = np.sort(muertes_h0(X))
+        unicos = np.unique(X, axis=0)
+        esperado = np.sort(minimum_spanning_tree(squareform(pdist(unicos))).data)
+        np.testing.assert_allclose(muertes[muertes > 0], esperado)
+        # Las filas repetidas mueren en cero y queda una sola barra infinita
+        assert (muertes == 0).sum() == len(X) - len(unicos)
+        assert np.isinf(diagrama(X)[:, 1]).sum() == 1
+
+
+def test_sketch_cota_de_error():
+    rng = np.random.default_rng(0)
+    valores = rng.lognormal(5, 1.5, 200_000)
+    alfa = 0.001
+    sketch = SketchCuantiles(alfa)
+    for bloque in np.array_split(valores, 7):
+        sketch.actualizar(bloque)
+    ordenados = np.sort(valores)
+    for q in (0.0, 0.01, 0.25, 0.5, 0.99, 1.0):
+        exacto = ordenados[int(np.floor(q * (len(valores) - 1)))]
+        assert abs(sketch.cuantil(q) - exacto) <= alfa * exacto * (1 + 1e-9)
+
+
+def test_ventanas_igual_a_cada_ventana():
+    rng = np.random.default_rng(0)
+    serie = np.round(rng.normal(3, 0.5, 400), 2)
+    diagramas = persistencia_ventanas(serie, 50, 2, 3, maxdim=0, tamaño_lote=100, n_procesos=1)
+    assert len(diagramas) == len(serie) - 49
+    for i in (0, 17, len(diagramas) - 1):
+        ventana = serie[i:i + 50]
+        embebida = np.column_stack([ventana[k * 2:k * 2 + 46] for k in range(3)])
+        np.testing.assert_allclose(diagramas[i][0], diagrama(embebida))
+
+
+# Wasserstein de orden 1 por fuerza bruta: cada punto se empareja con uno del otro
+# diagrama o con la diagonal
+def _wasserstein_bruto(A, B):
+    costo = np.zeros((len(A) + len(B),) * 2)
+    costo[:len(A), :len(B)] = cdist(A, B, "chebyshev")
+    costo[:len(A), len(B):] = 0.5 * (A[:, 1] - A[:, 0])[:, None]
+    costo[len(A):, :len(B)] = 0.5 * (B[:, 1] - B[:, 0])[None, :]
+    n = len(costo)
+    return min(costo[np.arange(n), list(p)].sum() for p in itertools.permutations(range(n)))
+
+
+def test_wasserstein_exacta_igual_a_fuerza_bruta():
+    rng = np.random.default_rng(0)
+    diagramas = []
+    for n in (3, 2, 4, 0):
+        nacimiento = rng.uniform(0, 1, n)
+        diagramas.append(np.c_[nacimiento, nacimiento + rng.uniform(0, 1, n)])
+    i, j = np.triu_indices(len(diagramas), k=1)
+    obtenido = distancias(diagramas, i, j, n_procesos=1)
+    esperado = [_wasserstein_bruto(diagramas[a], diagramas[b]) for a, b in zip(i, j)]
+    np.testing.assert_allclose(obtenido, esperado)
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingesta import cargar_año, convertir_año
+from limpieza import derivar_unidad, limpiar_edenred
+
+
+def test_unidad_igual_en_libro_y_en_cache(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 200
+    identificadores = np.array(rng.choice(["1FTFW 01", "1FTFW02", "3HAMM 7"], n), dtype=object)
+    # Celdas numéricas en el identificador: con los tipos del libro dan SIN_DATO
+    identificadores[::9] = 12345
+    libro = pd.DataFrame({
+        "Fecha Transaccion": [f"{d:02d}/03/2024" for d in rng.integers(1, 28, n)],
+        "Concepto": rng.choice(["Consumo", "Ajuste"], n),
+        "Vehículo": rng.choice(["Unidad 1FTFW01 ABC", "Unidad 1FTFW02 XYZ", "Tracto 12345"], n),
+        "Identificador  Vehículo": identificadores,
+        "No Estación Pemex": rng.choice([9361, "ABC"], n),
+        "Recorrido": rng.gamma(2, 150, n).round(1),
+        "Rendimiento Real": rng.normal(11, 5, n).round(2),
+        "Month": "Mar",
+    })
+    ruta = str(tmp_path / "Edenred 2024.xlsx")
+    libro.to_excel(ruta, index=False)
+
+    fresco = derivar_unidad(limpiar_edenred(pd.read_excel(ruta), 2024))
+    dir_cache = str(tmp_path / "cache")
+    os.makedirs(dir_cache)
+    convertir_año(2024, ruta, dir_cache)
+    cacheado = cargar_año(2024, dir_cache)["Unidad"]
+
+    assert (fresco == "SIN_DATO").any()
+    assert fresco.tolist() == cacheado.astype(str).tolist()
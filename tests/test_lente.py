@@ -0,0 +1,22 @@
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from lente import density_filter_cosine, estadisticas_cache, lente_cacheada
+
+
+def test_lente_cacheada_sin_salida(tmp_path, capsys):
+    X = np.random.default_rng(0).normal(size=(300, 3))
+    scaler = StandardScaler().fit(X)
+    Xs = scaler.transform(X)
+    columnas = ["recorrido", "precio_unitario", "cantidad_mercancía"]
+    dir_cache = str(tmp_path)
+
+    calculada = lente_cacheada(Xs, columnas, scaler, 1, dir_cache=dir_cache)
+    assert estadisticas_cache(dir_cache)["ultima"]["acierto"] is False
+    reutilizada = lente_cacheada(Xs, columnas, scaler, 1, dir_cache=dir_cache)
+    estadisticas = estadisticas_cache(dir_cache)
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["ultima"]["acierto"]) == (1, 1, True)
+
+    np.testing.assert_array_equal(reutilizada, calculada)
+    np.testing.assert_allclose(calculada, density_filter_cosine(Xs, 1))
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from prediccion_lotes import predecir_viajes
+from rasgos_modelo import RasgosModelo
+
+
+# Clasificador de prueba: la probabilidad de la clase eficiente es conductor_score
+class ModeloFijo:
+    def __init__(self, clases):
+        self.classes_ = np.array(clases)
+        self.bloques = []
+
+    def predict_proba(self, X):
+        self.bloques.append(len(X))
+        positiva = X["conductor_score"].to_numpy()
+        return np.column_stack([1 - positiva, positiva])
+
+
+def _rasgos_y_viajes(n=7):
+    df_modelo = pd.DataFrame({
+        "conductor": ["ANA", "ANA", "LUIS", "EVA"],
+        "vehículo": ["V1", "V2", "V1", "V3"],
+        "eficiencia_ok": [1, 1, 0, 1],
+        "rendimiento_real": [10.0, 12.0, 8.0, 9.0],
+    })
+    viajes = pd.DataFrame({
+        "conductor": np.resize(["ANA", "LUIS", "NUEVO"], n),
+        "vehículo": np.resize(["V1", "V3"], n),
+        "division": "RPF", "bl": "RPI", "mercancía": "DIESEL", "no_estación_pemex": "9361",
+    })
+    return RasgosModelo.construir(df_modelo), viajes
+
+
+@pytest.mark.parametrize("clases", [[0, 1], [False, True], ["0", "1"]])
+def test_predecir_por_bloques_incompletos(clases):
+    rasgos, viajes = _rasgos_y_viajes(7)
+    modelo = ModeloFijo(clases)
+    resultado = predecir_viajes(viajes, modelo, rasgos, tamaño_bloque=3)
+    assert modelo.bloques == [3, 3, 1]
+    np.testing.assert_allclose(resultado["predict_proba"], np.resize([1.0, 0.0, 0.5], 7))
+    # En el empate (conductor sin historial) gana la primera clase, como en argmax
+    assert resultado["pred"].tolist() == [clases[k] for k in np.resize([1, 0, 0], 7)]
+    assert resultado[viajes.columns].equals(viajes)
+
+
+def test_sin_clase_eficiente():
+    rasgos, viajes = _rasgos_y_viajes(2)
+    with pytest.raises(ValueError, match="clase eficiente"):
+        predecir_viajes(viajes, ModeloFijo(["malo", "bueno"]), rasgos)
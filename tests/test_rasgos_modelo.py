@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from rasgos_modelo import RasgosModelo
+
+
+def test_claves_enteras_de_columna_float_con_nulos(tmp_path):
+    # El id del vehículo se leyó como float por el NaN de la columna
+    df_modelo = pd.DataFrame({
+        "conductor": ["ANA", "ANA", "LUIS", "LUIS"],
+        "vehículo": [123.0, 123.0, np.nan, 77.5],
+        "eficiencia_ok": [1, 0, 1, 1],
+        "rendimiento_real": [10.0, 12.0, 8.0, 9.0],
+    })
+    construidos = RasgosModelo.construir(df_modelo)
+    construidos.guardar(str(tmp_path))
+    for rasgos in (construidos, RasgosModelo.cargar(str(tmp_path))):
+        assert rasgos.conoce("vehículo", 123) and rasgos.conoce("vehículo", "123.0")
+        assert not rasgos.conoce("vehículo", "nan")
+        esperado = {"conductor_score": 0.5, "vehiculo_score": 0.5, "rend_cond_mean": 11.0, "rend_veh_mean": 11.0}
+        assert rasgos.rasgos("ANA", 123) == esperado
+        # La misma búsqueda en lote con las claves como int, texto y float
+        viajes = pd.DataFrame({"conductor": ["ANA", "LUIS", "ANA"], "vehículo": pd.array([123, 77, None], dtype="Int64")})
+        unidos = rasgos.unir(viajes, omision=None)
+        assert unidos.loc[0].to_dict() == esperado
+        assert np.isnan(unidos.loc[1, "vehiculo_score"]) and np.isnan(unidos.loc[2, "rend_veh_mean"])
+        texto = rasgos.unir(viajes.assign(vehículo=["123", "77.5", "123.0"]), omision=None)
+        assert texto["rend_veh_mean"].tolist() == [11.0, 9.0, 11.0]
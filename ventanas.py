@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- Persistencia por ventanas móviles sobre una serie ---
+# La serie se embebe una sola vez (embed_time_series, vista sin copiar) y la ventana i
+# usa los puntos i .. i + m - 1 del embedding, con m = window_size - (dim - 1) * delay.
+# Dos ventanas consecutivas comparten m - 1 puntos, así que las distancias se calculan
+# una vez por lote de ventanas en una tabla en banda: banda[a, k] = |E[a] - E[a + k]|
+# para k < m. La matriz de distancias de cada ventana es una lectura de esa tabla, y
+# de ahí:
+#   * H0 con el árbol de expansión mínima sobre la matriz (sin ripser);
+#   * H1 (maxdim >= 1) con ripser(distance_matrix=True), sin volver a calcular distancias.
+# Los lotes se reparten en un pool de procesos.
+WINDOW_SIZE = 50
+DELAY = 2
+DIM = 3
+TAMAÑO_LOTE = 2048
+
+# Estado de cada proceso del pool
+_E = None
+
+
+def _iniciar_proceso(serie, delay, dim):
+    global _E
+    _E = None if serie is None else embed_time_series(serie, delay, dim)
+
+
+# Embedding de Takens como vista de solo lectura sobre la serie, sin copiar: la fila t es
+# serie[t], serie[t + delay], ..., serie[t + (dim - 1) * delay]. Con una serie (n,) el
+# resultado es (n - (dim - 1) * delay) x dim; con varias series en columnas (n x k),
+# (n - (dim - 1) * delay) x k x dim
+def embed_time_series(time_series, delay, dim):
+    return sliding_window_view(np.asarray(time_series), (dim - 1) * delay + 1, axis=0)[..., ::delay]
+
+
+# Todas las ventanas del embedding a la vez, también como vista: ventanas[i] es
+# embed_time_series(serie[i:i + window_size], delay, dim), de m = window_size - (dim - 1) * delay
+# puntos
+def ventanas_embebidas(time_series, window_size=WINDOW_SIZE, delay=DELAY, dim=DIM):
+    E = embed_time_series(time_series, delay, dim)
+    return np.moveaxis(sliding_window_view(E, window_size - (dim - 1) * delay, axis=0), -1, 1)
+
+
+# banda[a, k] = distancia entre E[a] y E[a + k] (inf si a + k se sale de E); con varias
+# series la distancia es sobre todas sus coordenadas
+def distancias_banda(E, m):
+    banda = np.full((len(E), m), np.inf)
+    ejes = tuple(range(1, E.ndim))
+    for k in range(m):
+        banda[:len(E) - k, k] = np.sqrt(np.square(E[k:] - E[:len(E) - k]).sum(axis=ejes))
+    return banda
+
+
+# Muertes finitas de H0 a partir de una matriz de distancias completa (Prim)
+def muertes_h0_matriz(D):
+    n = len(D)
+    muertes = np.empty(max(n - 1, 0))
+    if n <= 1:
+        return muertes
+    en_arbol = np.zeros(n, dtype=bool)
+    en_arbol[0] = True
+    distancia = D[0].copy()
+    distancia[0] = np.inf
+    for paso in range(n - 1):
+        j = np.argmin(distancia)
+        muertes[paso] = distancia[j]
+        en_arbol[j] = True
+        np.minimum(distancia, D[j], out=distancia)
+        distancia[en_arbol] = np.inf
+    return muertes
+
+
+def _diagrama_h0(D):
+    muertes = np.sort(muertes_h0_matriz(D))
+    muertes = muertes[muertes > 0]
+    return np.vstack([np.c_[np.zeros(len(muertes)), muertes], [[0.0, np.inf]]])
+
+
+# Diagramas [H0, ..., H_maxdim] de las ventanas [inicio, fin), como ripser(emb)["dgms"]
+def _diagramas_lote(inicio, fin, m, maxdim):
+    banda = distancias_banda(_E[inicio:fin + m - 1], m)
+    a = np.arange(m)
+    fila, salto = np.minimum.outer(a, a), np.abs(np.subtract.outer(a, a))
+    if maxdim >= 1:
+        from ripser import ripser
+
+    diagramas = []
+    for i in range(fin - inicio):
+        D = banda[i + fila, salto]
+        if maxdim == 0:
+            diagramas.append([_diagrama_h0(D)])
+        else:
+            diagramas.append(ripser(D, maxdim=maxdim, distance_matrix=True)["dgms"])
+    return diagramas
+
+
+# Diagramas de todas las ventanas de `serie` (una lista por ventana, igual que
+# ripser(embed_time_series(ventana, delay, dim))["dgms"]); `serie` puede tener varias
+# columnas (n x k). n_procesos=1 los calcula en el proceso actual
+def persistencia_ventanas(serie, window_size=WINDOW_SIZE, delay=DELAY, dim=DIM, maxdim=1,
+                          tamaño_lote=TAMAÑO_LOTE, n_procesos=None):
+    serie = np.asarray(serie, dtype=np.float64)
+    m = window_size - (dim - 1) * delay
+    n_ventanas = max(len(serie) - window_size + 1, 0)
+    inicios = list(range(0, n_ventanas, tamaño_lote))
+    argumentos = (
+        inicios,
+        [min(i + tamaño_lote, n_ventanas) for i in inicios],
+        [m] * len(inicios),
+        [maxdim] * len(inicios),
+    )
+
+    n_procesos = n_procesos or os.cpu_count() or 1
+    if n_procesos == 1 or len(inicios) <= 1:
+        _iniciar_proceso(serie, delay, dim)
+        try:
+            lotes = list(map(_diagramas_lote, *argumentos))
+        finally:
+            _iniciar_proceso(None, None, None)
+    else:
+        # Cada proceso recibe la serie (no el embedding) y arma su propia vista
+        with ProcessPoolExecutor(
+            max_workers=n_procesos, initializer=_iniciar_proceso, initargs=(serie, delay, dim)
+        ) as pool:
+            lotes = list(pool.map(_diagramas_lote, *argumentos))
+    return [diagramas for lote in lotes for diagramas in lote]
+
+
+# Fecha del centro de cada ventana, como fechas[i + window_size // 2]
+def fechas_ventanas(fechas, window_size=WINDOW_SIZE):
+    n_ventanas = max(len(fechas) - window_size + 1, 0)
+    return fechas[window_size // 2:window_size // 2 + n_ventanas]